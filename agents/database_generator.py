@@ -1,6 +1,8 @@
 ## this is goind to be a pdf validator agent
 from dotenv import load_dotenv
 import os
+import re
+import json
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
@@ -34,6 +36,109 @@ def create_vectordb_from_pdf(input_pdf_path, persist_directory="db"):
     return vectordb
 
 
+# Keywords of the section titles that apply to each CCMTA report segment
+SEGMENT_SECTION_KEYWORDS = {
+    "header": r"header",
+    "changes_in_drivers_duty_status_intermediate_logs_and_special_driving_conditions": r"duty status|intermediate log|special driving|personal use|yard move",
+    "loginlogout_certification_of_rods_data_diagnostics_and_malfunctions": r"log ?in|log ?out|certif|diagnostic|malfunction",
+    "change_in_drivers_cycle_change_in_operating_zone_offduty_time_deferral": r"cycle|operating zone|deferral",
+    "comments_remarks_and_annotations": r"comment|remark|annotation",
+    "additional_hours_not_recorded": r"additional hours|not recorded",
+    "engine_power_up_and_shut_down": r"engine power|power.?up|shut.?down",
+}
+
+# Maximum text (in characters) of the sections indexed for a segment in one corpus. The sections
+# are sent with every validation prompt of the segment, broad keywords would otherwise pull in
+# whole chapters.
+MAX_SEGMENT_SECTION_CHARS = 12000
+
+# A numbered section heading, e.g. "4.5.1.2 Header Segment"
+SECTION_HEADING = re.compile(r"^\s*(\d+(?:\.\d+){0,5})\.?\s+([A-Z][^\n]{2,120})$", re.MULTILINE)
+
+
+def split_numbered_sections(input_pdf_path):
+    """
+    Split a PDF file into its numbered sections.
+    Args:
+        input_pdf_path (str): Path to the input PDF file.
+    Returns:
+        sections (list[dict]): The sections in document order, with their number, title, first page and text.
+    """
+    from pypdf import PdfReader
+
+    sections = []
+    for page_number, page in enumerate(PdfReader(input_pdf_path).pages):
+        text = page.extract_text() or ""
+        position = 0
+        for match in SECTION_HEADING.finditer(text):
+            if sections:
+                sections[-1]["text"] += text[position:match.start()]
+            sections.append({
+                "section": match.group(1),
+                "title": match.group(2).strip(),
+                "page": page_number,
+                "text": "",
+            })
+            position = match.start()
+        if sections:
+            sections[-1]["text"] += text[position:]
+    return sections
+
+
+def _cap_sections(matched, max_chars):
+    """
+    Keep the matched sections of a segment within max_chars of text.
+    Sections whose title matches come first, then their subsections from the shallowest down,
+    each in document order. The kept sections are returned in document order.
+    """
+    ranked = sorted(range(len(matched)), key=lambda i: (matched[i]["depth"], i))
+    kept = set()
+    total = 0
+    for i in ranked:
+        size = len(matched[i]["section"]["text"])
+        if total + size <= max_chars:
+            kept.add(i)
+            total += size
+    return [matched[i]["section"] for i in sorted(kept)]
+
+
+def build_segment_section_index(input_pdf_paths, output_path="segment_section_index.json", max_chars=MAX_SEGMENT_SECTION_CHARS):
+    """
+    Build the index of the regulation sections that apply to each CCMTA report segment.
+    A section applies to a segment if its title matches the segment keywords, its subsections are included
+    as long as the text of the segment stays within max_chars per corpus. Prints the size kept per segment.
+    Args:
+        input_pdf_paths (dict): Path to the PDF file of each corpus, keyed by corpus name.
+        output_path (str): Path to the output JSON file.
+        max_chars (int): Maximum text of the sections of a segment in one corpus.
+    Returns:
+        index (dict): The sections of each corpus, keyed by segment id and corpus name.
+    """
+    index = {segment_id: {} for segment_id in SEGMENT_SECTION_KEYWORDS}
+    for corpus, input_pdf_path in input_pdf_paths.items():
+        sections = split_numbered_sections(input_pdf_path)
+        for segment_id, keywords in SEGMENT_SECTION_KEYWORDS.items():
+            matched = []
+            for section in sections:
+                if re.search(keywords, section["title"].lower()):
+                    matched.append({"section": section, "depth": 0})
+                    continue
+                # depth below the closest matched parent section
+                parents = [parent for parent in matched if section["section"].startswith(parent["section"]["section"] + ".")]
+                if parents:
+                    parent = max(parents, key=lambda parent: len(parent["section"]["section"]))
+                    depth = section["section"].count(".") - parent["section"]["section"].count(".")
+                    matched.append({"section": section, "depth": parent["depth"] + depth})
+            index[segment_id][corpus] = _cap_sections(matched, max_chars)
+            matched_chars = sum(len(match["section"]["text"]) for match in matched)
+            kept_chars = sum(len(section["text"]) for section in index[segment_id][corpus])
+            print(f"{segment_id} / {corpus}: {len(index[segment_id][corpus])} of {len(matched)} sections, {kept_chars} of {matched_chars} characters")
+
+    with open(output_path, "w") as f:
+        json.dump(index, f, indent=4)
+    return index
+
+
 
 if __name__ == "__main__":
     # measure the time taken to create the vector store
@@ -45,8 +150,21 @@ if __name__ == "__main__":
     vectordb = create_vectordb_from_pdf(input_pdf_path, persist_directory="eld_tech_standard_db")
     print(f"Vector store created in {time.time() - start_time:.2f} seconds.")
 
+    # export the flat NumPy index used when VECTOR_STORE_BACKEND=flat
+    from flat_vector_store import export_flat_index, flat_index_path
+    export_flat_index(vectordb, flat_index_path("eld_tech_standard_db"))
+
     input_pdf_path = "HoS-Application-Guide.pdf"
     vectordb = create_vectordb_from_pdf(input_pdf_path, persist_directory="hos_app_guide_db")
+    export_flat_index(vectordb, flat_index_path("hos_app_guide_db"))
+
+    # index the sections that apply to each segment, so validators can look them up without any search
+    start_time = time.time()
+    build_segment_section_index({
+        "eld_tech_standard": "FINAL_ELD_TECHNICAL_STANDARD_V1.2_ENGLISH_10-27-2020.pdf",
+        "hos_app_guide": "HoS-Application-Guide.pdf",
+    })
+    print(f"Segment section index created in {time.time() - start_time:.2f} seconds.")
     
     query = "Header Segment"
     query = "What is the purpose of the Header Segment in the ELD Technical Standard?"
@@ -0,0 +1,123 @@
+## flat vector index for the static knowledge corpora
+# The ELD technical standard and the HoS application guide never change between builds, so their
+# chunks are stored as a memory-mapped matrix of normalized embeddings (embeddings.npy) with a
+# sidecar metadata file (metadata.json). A top-k query is one matrix-vector product over the
+# mapped matrix, without the SQLite/HNSW machinery of Chroma.
+from __future__ import annotations
+
+import os
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+
+# Name of the flat index directory inside a vector database directory
+FLAT_INDEX_DIR = "flat"
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+# Flat indexes already opened, keyed by path
+_flat_indexes = {}
+
+
+def flat_index_path(vector_db_path: str) -> str:
+    """
+    Return the path of the flat index exported from a vector database.
+    Args:
+        vector_db_path (str): Path to the Chroma vector database.
+    Returns:
+        str: Path to the flat index directory.
+    """
+    return os.path.join(vector_db_path, FLAT_INDEX_DIR)
+
+
+def export_flat_index(vectordb: Chroma, output_dir: str) -> str:
+    """
+    Export the chunks of a Chroma vector database to a flat index.
+    Args:
+        vectordb (Chroma): The vector database to export.
+        output_dir (str): Directory of the flat index.
+    Returns:
+        str: Path to the flat index directory.
+    """
+    import numpy as np
+
+    data = vectordb.get(include=["embeddings", "documents", "metadatas"])
+    embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+    # normalize so the dot product is the cosine similarity
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.where(norms == 0, 1, norms)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, EMBEDDINGS_FILE), embeddings)
+    records = [
+        {"id": doc_id, "page_content": document, "metadata": metadata or {}}
+        for doc_id, document, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+    ]
+    with open(os.path.join(output_dir, METADATA_FILE), "w") as f:
+        json.dump(records, f)
+
+    # the index changed on disk, drop any opened copy
+    _flat_indexes.pop(str(Path(output_dir).resolve()), None)
+    return output_dir
+
+
+def load_flat_index(index_path: str):
+    """
+    Open a flat index, reusing it if it was already opened.
+    The embeddings matrix is memory-mapped, pages are only read from disk when a query touches them.
+    Args:
+        index_path (str): Path to the flat index directory.
+    Returns:
+        tuple[numpy.ndarray, list[dict]]: The normalized embeddings matrix and the chunk records.
+    """
+    key = str(Path(index_path).resolve())
+    if key not in _flat_indexes:
+        import numpy as np
+
+        embeddings_path = os.path.join(index_path, EMBEDDINGS_FILE)
+        if not os.path.exists(embeddings_path):
+            raise FileNotFoundError(f"The flat index path {index_path} does not exist.")
+        embeddings = np.load(embeddings_path, mmap_mode="r")
+        with open(os.path.join(index_path, METADATA_FILE), "r") as f:
+            records = json.load(f)
+        _flat_indexes[key] = (embeddings, records)
+    return _flat_indexes[key]
+
+
+def search_flat_index(index_path: str, query_embeddings: list[list[float]], k: int=2) -> list[list[Document]]:
+    """
+    Find the k most similar chunks for each query embedding.
+    All the queries are answered with a single matrix product.
+    Args:
+        index_path (str): Path to the flat index directory.
+        query_embeddings (list[list[float]]): The embeddings of the queries.
+        k (int): The number of chunks to return per query.
+    Returns:
+        list[list[Document]]: The chunks of each query, most similar first.
+    """
+    import numpy as np
+    from langchain_core.documents import Document
+
+    embeddings, records = load_flat_index(index_path)
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    queries /= np.where(norms == 0, 1, norms)
+
+    # (chunks x dim) @ (dim x queries) -> (chunks x queries) cosine similarities
+    scores = embeddings @ queries.T
+    k = min(k, scores.shape[0])
+    # top k per query without sorting the whole column, then order those k
+    top = np.argpartition(-scores, k - 1, axis=0)[:k]
+    results = []
+    for query_index in range(queries.shape[0]):
+        candidates = top[:, query_index]
+        ordered = candidates[np.argsort(-scores[candidates, query_index])]
+        results.append([
+            Document(page_content=records[i]["page_content"], metadata=records[i]["metadata"])
+            for i in ordered
+        ])
+    return results
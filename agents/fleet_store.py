@@ -0,0 +1,254 @@
+## fleet-wide store of extracted reports
+# Every extracted report sits alone next to its PDF. Fleet level questions ("all unidentified driver
+# events this week", "every malfunction code across drivers") are answered from a single indexed
+# SQLite database where the rows of all the ingested reports are keyed by report, driver, date and segment.
+import os
+import re
+import json
+import sqlite3
+
+from agents.pdf_data_handler_v2 import load_retrieval_data, parse_logs_date
+
+# Default location of the fleet database
+FLEET_DB_PATH = os.getenv("FLEET_DB_PATH", "./fleet_reports.db")
+
+# Version of the stored rows, reports ingested by an older version are ingested again
+FLEET_DB_VERSION = 2
+
+# Columns the aggregate queries can group by
+GROUP_BY_COLUMNS = {"report": "reports.path", "driver": "report_rows.driver", "date": "report_rows.date", "segment": "report_rows.segment"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    report_id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    driver TEXT,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_rows (
+    report_id INTEGER NOT NULL REFERENCES reports(report_id),
+    driver TEXT,
+    date TEXT NOT NULL,
+    iso_date TEXT,
+    segment TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    row_json TEXT NOT NULL,
+    row_text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rows_segment_date ON report_rows (segment, iso_date);
+CREATE INDEX IF NOT EXISTS idx_rows_driver_date ON report_rows (driver, iso_date);
+CREATE INDEX IF NOT EXISTS idx_rows_date_segment ON report_rows (date, segment);
+CREATE INDEX IF NOT EXISTS idx_rows_report ON report_rows (report_id);
+"""
+
+# Dates written in a cell, e.g. the "2025-06-01 08:00" date and time of an unidentified driver record
+DATE_IN_CELL = re.compile(r"\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}/\d{1,2}/\d{4}|[A-Za-z]{3,9} \d{1,2}, \d{4}|\d{1,2}-[A-Za-z]{3}-\d{4}")
+
+
+def connect_fleet_db(db_path: str=FLEET_DB_PATH) -> sqlite3.Connection:
+    """
+    Open the fleet database, creating its tables and indexes if needed.
+    Args:
+        db_path (str): Path to the fleet database.
+    Returns:
+        sqlite3.Connection: The connection.
+    """
+    connection = sqlite3.connect(db_path)
+    # readers are not blocked while a report is being ingested
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    if connection.execute("PRAGMA user_version").fetchone()[0] < FLEET_DB_VERSION:
+        with connection:
+            connection.execute("DELETE FROM report_rows")
+            connection.execute("DELETE FROM reports")
+            connection.execute(f"PRAGMA user_version = {FLEET_DB_VERSION}")
+    return connection
+
+
+def _report_driver(report: dict, data_file_path: str) -> str:
+    """
+    Return the driver of a report from its header table, or the report file name if not found.
+    The header table has the labels in its first row and the values in the second one.
+    """
+    for segments in report.values():
+        for table in segments.get("header", []):
+            if len(table) < 2:
+                continue
+            labels = [re.sub(r"\s+", " ", (cell or "").lower()) for cell in table[0]]
+            for pattern in (r"driver.*\bid\b", r"driver.*name", r"driver"):
+                for i, label in enumerate(labels):
+                    if re.search(pattern, label) and i < len(table[1]) and table[1][i]:
+                        return table[1][i].strip()
+    return os.path.basename(data_file_path).rsplit("_tables", 1)[0]
+
+
+def _data_rows(tables: list) -> list:
+    """
+    Return the data rows of the tables of a segment, without their column header rows.
+    The first table of a segment starts with its column header row (the labels row of the header
+    segment), the following tables either repeat it or continue without one.
+    """
+    rows = []
+    header_row = None
+    for table in tables:
+        for row_index, row in enumerate(table):
+            if row_index == 0 and (header_row is None or row == header_row):
+                header_row = row
+                continue
+            rows.append(row)
+    return rows
+
+
+def _row_date(row: list) -> str | None:
+    """
+    Return the ISO date written in the cells of a row, or None if it has none.
+    """
+    for cell in row:
+        for match in DATE_IN_CELL.finditer(cell or ""):
+            parsed_date = parse_logs_date(match.group())
+            if parsed_date:
+                return parsed_date.isoformat()
+    return None
+
+
+def _find_report_files(paths: list[str]) -> list[str]:
+    """
+    Expand directories into the extracted report files they contain.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(("_tables.json", "_tables.jsonl")))
+        else:
+            files.append(path)
+    return files
+
+
+def ingest_reports(paths: list[str], db_path: str=FLEET_DB_PATH) -> dict:
+    """
+    Ingest extracted reports into the fleet database.
+    Reports already ingested and not modified since are skipped, modified ones are replaced.
+    Only data rows are stored, the column header rows of the tables are left out.
+    Args:
+        paths (list[str]): Files created by create_retrieval_data, or directories containing them.
+        db_path (str): Path to the fleet database.
+    Returns:
+        dict: The number of "ingested" and "skipped" reports and of ingested "rows".
+    """
+    connection = connect_fleet_db(db_path)
+    ingested = skipped = rows = 0
+    try:
+        for data_file_path in _find_report_files(paths):
+            path = os.path.abspath(data_file_path)
+            mtime = os.path.getmtime(path)
+            existing = connection.execute("SELECT report_id, mtime FROM reports WHERE path = ?", (path,)).fetchone()
+            if existing and existing[1] == mtime:
+                skipped += 1
+                continue
+
+            report = load_retrieval_data(path)
+            driver = _report_driver(report, path)
+            with connection:
+                if existing:
+                    connection.execute("DELETE FROM report_rows WHERE report_id = ?", (existing[0],))
+                    connection.execute("UPDATE reports SET driver = ?, mtime = ? WHERE report_id = ?", (driver, mtime, existing[0]))
+                    report_id = existing[0]
+                else:
+                    report_id = connection.execute(
+                        "INSERT INTO reports (path, driver, mtime) VALUES (?, ?, ?)", (path, driver, mtime)
+                    ).lastrowid
+
+                records = []
+                for logs_date, segments in report.items():
+                    parsed_date = parse_logs_date(logs_date)
+                    iso_date = parsed_date.isoformat() if parsed_date else None
+                    for segment_id, tables in segments.items():
+                        for row_index, row in enumerate(_data_rows(tables)):
+                            row_text = " ".join(cell for cell in row if cell).lower()
+                            # the unidentified driver records have no logs date, each row has its own
+                            row_iso_date = iso_date or _row_date(row)
+                            records.append((report_id, driver, logs_date, row_iso_date, segment_id, row_index, json.dumps(row), row_text))
+                connection.executemany("INSERT INTO report_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+            ingested += 1
+            rows += len(records)
+    finally:
+        connection.close()
+    return {"ingested": ingested, "skipped": skipped, "rows": rows}
+
+
+def query_reports(
+    db_path: str=FLEET_DB_PATH,
+    segment: str | None=None,
+    driver: str | None=None,
+    date_from: str | None=None,
+    date_to: str | None=None,
+    unidentified: bool=False,
+    contains: str | None=None,
+    group_by: list[str] | None=None,
+    limit: int=100,
+) -> list[dict]:
+    """
+    Query the rows of all the ingested reports.
+    Args:
+        db_path (str): Path to the fleet database.
+        segment (str | None): Only rows of this segment id.
+        driver (str | None): Only rows of this driver.
+        date_from (str | None): Only rows logged on or after this date (YYYY-MM-DD).
+        date_to (str | None): Only rows logged on or before this date (YYYY-MM-DD).
+        unidentified (bool): Only rows of the unidentified driver records. They have no logs date, date_from
+            and date_to apply to the date written in each row.
+        contains (str | None): Only rows containing this text (case insensitive). This scans the rows left by
+            the other filters, see benchmarks/fleet_contains.py.
+        group_by (list[str] | None): Count the matching rows per "report", "driver", "date" and/or "segment"
+            instead of returning them.
+        limit (int): Maximum number of rows or groups returned.
+    Returns:
+        list[dict]: The matching rows (report, driver, date, segment, row), or the groups with their "count".
+    """
+    conditions = []
+    params = []
+    if segment:
+        conditions.append("report_rows.segment = ?")
+        params.append(segment)
+    if driver:
+        conditions.append("report_rows.driver = ?")
+        params.append(driver)
+    if date_from:
+        conditions.append("report_rows.iso_date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("report_rows.iso_date <= ?")
+        params.append(date_to)
+    if unidentified:
+        conditions.append("report_rows.date = 'unidentified_driver'")
+    if contains:
+        conditions.append("report_rows.row_text LIKE ?")
+        params.append(f"%{contains.lower()}%")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    connection = connect_fleet_db(db_path)
+    try:
+        if group_by:
+            unknown = [name for name in group_by if name not in GROUP_BY_COLUMNS]
+            if unknown:
+                raise ValueError(f"Invalid group_by {', '.join(unknown)}. Valid values: {', '.join(GROUP_BY_COLUMNS)}.")
+            columns = ", ".join(GROUP_BY_COLUMNS[name] for name in group_by)
+            cursor = connection.execute(
+                f"SELECT {columns}, COUNT(*) FROM report_rows JOIN reports USING (report_id) {where} "
+                f"GROUP BY {columns} ORDER BY COUNT(*) DESC LIMIT ?",
+                params + [limit],
+            )
+            return [dict(zip(group_by + ["count"], values)) for values in cursor]
+
+        cursor = connection.execute(
+            f"SELECT reports.path, report_rows.driver, report_rows.date, report_rows.segment, report_rows.row_json "
+            f"FROM report_rows JOIN reports USING (report_id) {where} LIMIT ?",
+            params + [limit],
+        )
+        return [
+            {"report": path, "driver": row_driver, "date": logs_date, "segment": segment_id, "row": json.loads(row_json)}
+            for path, row_driver, logs_date, segment_id, row_json in cursor
+        ]
+    finally:
+        connection.close()
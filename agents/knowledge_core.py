@@ -1,20 +1,80 @@
 ## this is goind to be a pdf validator agent
+from __future__ import annotations
+
 import os
+import json
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+    from langchain_openai import OpenAIEmbeddings
 
 # Ensure the .env file is loaded to access environment variables
 load_dotenv()
 
-# Create embeddings and vector store
-embeddings = OpenAIEmbeddings(
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    model="text-embedding-3-small"
-)
+# Knowledge corpora built by database_generator
+ELD_TECH_STANDARD_DB = "./agents/eld_tech_standard_db"
+HOS_APP_GUIDE_DB = "./agents/hos_app_guide_db"
+# Sections of both corpora that apply to each report segment, built by database_generator
+SEGMENT_SECTION_INDEX = "./agents/segment_section_index.json"
+
+# Vector store backend used for the corpora: "chroma" (default) or "flat", the memory-mapped
+# NumPy index exported next to each Chroma database (see agents.flat_vector_store)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+
+# Maximum overlap between consecutive chunks of the corpora (chunk_overlap in database_generator)
+MAX_CHUNK_OVERLAP = 400
+# Overlaps shorter than this are not considered repeated text
+MIN_CHUNK_OVERLAP = 50
+
+# Embeddings client, built on the first retrieval instead of at import time
+_embeddings = None
+# Vector databases already opened, keyed by path
+_vectordbs = {}
+# Segment section indexes already loaded, keyed by path, with the modification time they were loaded at
+_segment_indexes = {}
+
+def get_embeddings() -> OpenAIEmbeddings:
+    """
+    Return the shared embeddings client, creating it on first use.
+    Returns:
+        embeddings (OpenAIEmbeddings): The embeddings client used by the vector stores.
+    """
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        _embeddings = OpenAIEmbeddings(
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            model="text-embedding-3-small"
+        )
+    return _embeddings
+
+def load_vectordb(vector_db_path: str) -> Chroma:
+    """
+    Open a vector database, reusing it if it was already opened.
+    Args:
+        vector_db_path (str): Path to the vector database.
+    Returns:
+        vectordb (Chroma): The vector database.
+    """
+    # valdiate if the folder exists
+    db_path = Path(vector_db_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"The vector database path {vector_db_path} does not exist.")
+    key = str(db_path.resolve())
+    if key not in _vectordbs:
+        from langchain_chroma import Chroma
+
+        # Load the vector database from the specified path
+        _vectordbs[key] = Chroma(
+            persist_directory=vector_db_path,
+            embedding_function=get_embeddings(),
+        )
+    return _vectordbs[key]
 
 def retrieve_knowledge(vector_db_path:str, query: str, chunks: int=2) -> list[Document]:
     """
@@ -26,15 +86,118 @@ def retrieve_knowledge(vector_db_path:str, query: str, chunks: int=2) -> list[Do
     Returns:
         results (list[Document]): A list of Document objects containing the relevant chunks.
     """
-    # valdiate if the folder exists
-    db_path = Path(vector_db_path)
-    if not db_path.exists():
-        raise FileNotFoundError(f"The vector database path {vector_db_path} does not exist.")
-    # Load the vector database from the specified path
-    vectordb = Chroma(
-        persist_directory=vector_db_path,
-        embedding_function=embeddings,
-    )
+    if VECTOR_STORE_BACKEND == "flat":
+        from agents.flat_vector_store import flat_index_path, search_flat_index
+
+        query_embedding = get_embeddings().embed_query(query)
+        return search_flat_index(flat_index_path(vector_db_path), [query_embedding], k=chunks)[0]
+
+    vectordb = load_vectordb(vector_db_path)
     # Perform a similarity search to find relevant chunks
     results = vectordb.similarity_search(query, k=chunks)
     return results
+
+def retrieve_knowledge_batch(vector_db_paths: list[str], queries: list[str], chunks: int=2) -> dict[str, list[Document]]:
+    """
+    Retrieve relevant chunks for many queries from many vector databases.
+    All the queries are embedded in a single request, each database is searched once per query
+    and the passages returned by several queries, or repeating the same page or text, are merged.
+    Args:
+        vector_db_paths (list[str]): Paths to the vector databases to search.
+        queries (list[str]): The queries to search for.
+        chunks (int): The number of relevant chunks to retrieve per query and database.
+    Returns:
+        results (dict[str, list[Document]]): The deduplicated passages of each vector database.
+    """
+    if VECTOR_STORE_BACKEND == "flat":
+        from agents.flat_vector_store import flat_index_path, search_flat_index
+
+        query_embeddings = get_embeddings().embed_documents(queries)
+        results = {}
+        for path in vector_db_paths:
+            # all the queries in a single matrix product
+            per_query = search_flat_index(flat_index_path(path), query_embeddings, k=chunks)
+            results[path] = deduplicate_passages([doc for docs in per_query for doc in docs])
+        return results
+
+    vectordbs = {path: load_vectordb(path) for path in vector_db_paths}
+    # one embedding request for all the queries
+    query_embeddings = get_embeddings().embed_documents(queries)
+
+    results = {}
+    for path, vectordb in vectordbs.items():
+        passages = []
+        for embedding in query_embeddings:
+            passages.extend(vectordb.similarity_search_by_vector(embedding, k=chunks))
+        results[path] = deduplicate_passages(passages)
+    return results
+
+def _overlap_length(first: str, second: str) -> int:
+    """
+    Return the length of the longest end of first that is also the start of second.
+    """
+    for length in range(min(len(first), len(second), MAX_CHUNK_OVERLAP), MIN_CHUNK_OVERLAP - 1, -1):
+        if first.endswith(second[:length]):
+            return length
+    return 0
+
+def deduplicate_passages(passages: list[Document]) -> list[Document]:
+    """
+    Remove repeated passages: the same chunk found by several queries, several chunks of the
+    same page, chunks contained in another one and the overlapping text of consecutive chunks.
+    Args:
+        passages (list[Document]): The passages in relevance order.
+    Returns:
+        results (list[Document]): The remaining passages, in the same order.
+    """
+    from langchain_core.documents import Document
+
+    results = []
+    seen_pages = set()
+    for doc in passages:
+        page = doc.metadata.get('page')
+        if page is not None:
+            page_key = (doc.metadata.get('source'), page)
+            if page_key in seen_pages:
+                continue
+            seen_pages.add(page_key)
+
+        text = doc.page_content
+        if any(text in kept.page_content for kept in results):
+            continue
+        # drop the text already given by the end or the start of a kept chunk
+        for kept in results:
+            text = text[_overlap_length(kept.page_content, text):]
+            text = text[:len(text) - _overlap_length(text, kept.page_content)]
+        if len(text.strip()) < MIN_CHUNK_OVERLAP:
+            continue
+        results.append(Document(page_content=text, metadata=doc.metadata))
+    return results
+
+def lookup_segment_knowledge(segment_id: str, index_path: str=SEGMENT_SECTION_INDEX) -> dict[str, str]:
+    """
+    Look up the regulation sections that apply to a report segment in the precomputed index.
+    No embedding request nor similarity search is made.
+    Args:
+        segment_id (str): The id of the report segment, e.g. "header".
+        index_path (str): Path to the segment section index.
+    Returns:
+        knowledge (dict[str, str]): The text of the applicable sections, keyed by corpus name.
+    """
+    if not Path(index_path).exists():
+        raise FileNotFoundError(f"The segment section index {index_path} does not exist.")
+    # reload the index once database_generator rebuilds it
+    mtime = os.path.getmtime(index_path)
+    if index_path not in _segment_indexes or _segment_indexes[index_path][0] != mtime:
+        with open(index_path, "r") as f:
+            _segment_indexes[index_path] = (mtime, json.load(f))
+    index = _segment_indexes[index_path][1]
+    if segment_id not in index:
+        raise KeyError(f"Unknown segment id {segment_id}. Valid ids: {', '.join(index)}.")
+
+    knowledge = {}
+    for corpus, sections in index[segment_id].items():
+        knowledge[corpus] = "\n".join(
+            f"{section['section']} {section['title']}\n{section['text']}" for section in sections
+        )
+    return knowledge
@@ -0,0 +1,242 @@
+## layout templates for the known ELD vendor report formats
+# Reports from the same ELD vendor always draw their segment tables with the same columns.
+# A template stores the bounding box and the column boundaries of each segment table,
+# keyed by a fingerprint of the report layout, so later reports from the same vendor can be
+# extracted by cropping each segment and splitting it on the known columns instead of running
+# the full table detection on the whole page.
+import os
+import re
+import json
+import hashlib
+
+from agents.pdf_data_handler_v2 import SEGMENT_TITLE_PATTERNS, DEFAULT_TABLE_SETTINGS, atomic_write
+
+# Default location of the template store
+LAYOUT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layout_templates.json")
+
+# Distance (in points) above a segment title where its table starts, for templates learned without it
+TITLE_MARGIN = 4
+# Slack (in points) around the learned table edges when cropping, so the ruling lines are kept
+CROP_SLACK = 1
+
+
+def _search_pattern(segment_id: str) -> str:
+    """
+    Return the title pattern of a segment usable with page.search, tolerant to spacing.
+    """
+    return SEGMENT_TITLE_PATTERNS[segment_id].replace(" ", r"\s*")
+
+
+def _segment_of_title(title: str | None) -> str | None:
+    """
+    Return the id of the segment whose title matches the given table title.
+    """
+    if not title:
+        return None
+    title = re.sub(r"\s+", " ", title.lower())
+    for segment_id, pattern in SEGMENT_TITLE_PATTERNS.items():
+        if re.search(pattern, title):
+            return segment_id
+    return None
+
+
+def find_segment_titles(page) -> list[tuple[float, str]]:
+    """
+    Locate the segment titles on a page.
+    Args:
+        page (pdfplumber.page.Page): The page to search.
+    Returns:
+        list[tuple[float, str]]: Top position and segment id of every title, sorted from top to bottom.
+    """
+    titles = []
+    for segment_id in SEGMENT_TITLE_PATTERNS:
+        for match in page.search(_search_pattern(segment_id), regex=True, case=False):
+            titles.append((match["top"], segment_id))
+    titles.sort()
+    return titles
+
+
+def layout_fingerprint(page) -> str | None:
+    """
+    Compute the layout fingerprint of a report from the page holding its header table.
+    The fingerprint combines the page size and the x position of the vertical ruling lines
+    of the header table, which are fixed for a given ELD vendor.
+    Args:
+        page (pdfplumber.page.Page): A page of the report.
+    Returns:
+        str | None: The fingerprint, or None if the page has no header table.
+    """
+    titles = find_segment_titles(page)
+    header_tops = [top for top, segment_id in titles if segment_id == "header"]
+    if not header_tops:
+        return None
+    top = header_tops[0] - TITLE_MARGIN
+    bottom = next((t for t, _ in titles if t > header_tops[0]), page.height)
+    vertical_edges = sorted({
+        round(edge["x0"])
+        for edge in page.edges
+        if edge["orientation"] == "v" and edge["top"] < bottom and edge["bottom"] > top
+    })
+    layout = [round(page.width), round(page.height), vertical_edges]
+    return hashlib.sha1(json.dumps(layout).encode()).hexdigest()
+
+
+def load_layout_templates(store_path: str=LAYOUT_TEMPLATES_PATH) -> dict:
+    """
+    Load the layout templates from the template store.
+    Args:
+        store_path (str): Path to the template store.
+    Returns:
+        dict: The templates keyed by layout fingerprint, empty if the store does not exist.
+    """
+    if not os.path.exists(store_path):
+        return {}
+    with open(store_path, "r") as f:
+        return json.load(f)
+
+
+def save_layout_templates(templates: dict, store_path: str=LAYOUT_TEMPLATES_PATH) -> None:
+    """
+    Save the layout templates to the template store.
+    The store is replaced atomically, so an extraction loading it never reads a partial write.
+    Args:
+        templates (dict): The templates keyed by layout fingerprint.
+        store_path (str): Path to the template store.
+    """
+    with atomic_write(store_path) as f:
+        json.dump(templates, f, indent=4)
+
+
+def learn_layout_template(pdf_path: str, vendor: str, store_path: str=LAYOUT_TEMPLATES_PATH) -> str:
+    """
+    Learn the layout template of a report with full table detection and persist it.
+    Args:
+        pdf_path (str): Path to a report of the vendor.
+        vendor (str): Name of the ELD vendor, stored with the template for reference.
+        store_path (str): Path to the template store.
+    Returns:
+        str: The layout fingerprint the template was stored under.
+    """
+    import pdfplumber
+
+    fingerprint = None
+    segments = {}
+    page_size = None
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            if fingerprint is None:
+                fingerprint = layout_fingerprint(page)
+                page_size = [page.width, page.height]
+            for table in page.find_tables(DEFAULT_TABLE_SETTINGS):
+                rows = table.extract()
+                if not rows or not rows[0]:
+                    continue
+                segment_id = _segment_of_title(rows[0][0])
+                if segment_id is None or segment_id in segments:
+                    continue
+                title_tops = [top for top, title_segment in find_segment_titles(page) if title_segment == segment_id]
+                if not title_tops:
+                    continue
+                x0, table_top, x1, _ = table.bbox
+                columns = sorted({round(cell[0], 1) for cell in table.cells} | {round(x1, 1)})
+                row_heights = [cell[3] - cell[1] for cell in table.cells]
+                segments[segment_id] = {
+                    "x0": x0,
+                    "x1": x1,
+                    "columns": columns,
+                    # the table top rule is this far above the title text
+                    "title_offset": title_tops[0] - table_top,
+                    # height of the smallest row, no table rows fit in a shorter region
+                    "row_height": min(row_heights),
+                }
+            page.close()
+            if fingerprint is not None and len(segments) == len(SEGMENT_TITLE_PATTERNS):
+                break
+
+    if fingerprint is None:
+        raise ValueError(f"No header table found in {pdf_path}, cannot fingerprint its layout.")
+
+    templates = load_layout_templates(store_path)
+    templates[fingerprint] = {"vendor": vendor, "page_size": page_size, "segments": segments}
+    save_layout_templates(templates, store_path)
+    return fingerprint
+
+
+def match_layout_template(page, templates: dict) -> dict | None:
+    """
+    Return the template matching the layout of the report the page belongs to.
+    Args:
+        page (pdfplumber.page.Page): A page of the report holding its header table.
+        templates (dict): The templates keyed by layout fingerprint.
+    Returns:
+        dict | None: The matching template, or None if there is no header table or no match.
+    """
+    fingerprint = layout_fingerprint(page)
+    if fingerprint is None:
+        return None
+    return templates.get(fingerprint)
+
+
+def extract_tables_with_template(page, template: dict, current_segment: str | None) -> list | None:
+    """
+    Extract the segment tables of a page by cropping each segment and splitting it on the template columns.
+    Args:
+        page (pdfplumber.page.Page): The page to extract.
+        template (dict): The layout template of the report.
+        current_segment (str | None): The segment continued at the top of the page, if any.
+    Returns:
+        list | None: The tables in the same format as page.extract_tables(), or None if the
+            page does not fit the template and full table detection must be used.
+    """
+    titles = find_segment_titles(page)
+    if not titles and current_segment is None:
+        # nothing to crop, let full table detection decide what the page holds
+        return None
+    segments = template["segments"]
+    if any(segment_id not in segments for _, segment_id in titles):
+        return None
+
+    def table_top(title_top: float, segment_id: str) -> float:
+        return title_top - segments[segment_id].get("title_offset", TITLE_MARGIN) - CROP_SLACK
+
+    regions = []
+    first_top = table_top(*titles[0]) if titles else page.height
+    # table rows above the first title continue the segment of the previous page
+    if current_segment is not None and first_top > segments.get(current_segment, {}).get("row_height", TITLE_MARGIN):
+        regions.append((0, first_top, current_segment, False))
+    for i, (top, segment_id) in enumerate(titles):
+        bottom = table_top(*titles[i + 1]) if i + 1 < len(titles) else page.height
+        regions.append((max(0, table_top(top, segment_id)), bottom, segment_id, True))
+
+    tables = []
+    for top, bottom, segment_id, has_title in regions:
+        segment_template = segments.get(segment_id)
+        if segment_template is None or bottom <= top:
+            return None
+        x0 = max(0, segment_template["x0"] - 1)
+        x1 = min(page.width, segment_template["x1"] + 1)
+        region = page.crop((x0, top, x1, bottom))
+        found_tables = region.find_tables({
+            "vertical_strategy": "explicit",
+            "explicit_vertical_lines": segment_template["columns"],
+            "horizontal_strategy": "lines",
+        })
+        region_tables = [table.extract() for table in found_tables]
+        if has_title and not region_tables:
+            return None
+        if has_title:
+            if not region_tables[0]:
+                return None
+            title_row = region_tables[0][0]
+            if segment_id == "header":
+                # the header labels are real columns, "Date of RODS" is the first one
+                title = title_row[0]
+            else:
+                # the title row spans all the columns and the template columns cut through its text,
+                # read the title from the whole row instead
+                title = region.crop(found_tables[0].rows[0].bbox).extract_text()
+                region_tables[0][0] = [title] + [None] * (len(title_row) - 1)
+            if _segment_of_title(title) != segment_id:
+                return None
+        tables.extend(region_tables)
+    return tables
@@ -0,0 +1,222 @@
+## shared LLM client layer
+# One place to build the OpenAI clients used by the agents: pooled HTTP connections, per call
+# timeouts, retries with jittered exponential backoff, a configurable base URL (so tests can point
+# at a local OpenAI compatible server) and routing of small segments to a cheaper model.
+#
+# Settings (environment variables):
+#   LLM_BASE_URL          base URL of the OpenAI compatible API (default: OpenAI)
+#   LLM_TIMEOUT           default timeout of a call in seconds (default: 60)
+#   LLM_MAX_RETRIES       retries of a failed call (default: 3)
+#   LLM_MAX_CONNECTIONS   size of the HTTP connection pool (default: 20)
+#   LLM_ROUTING_RULES     JSON list of routing rules, see route_model
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+# Ensure the .env file is loaded to access environment variables
+load_dotenv()
+
+# Logged to stderr: stdout is the JSON-RPC channel of the MCP server when it runs over stdio
+logger = logging.getLogger(__name__)
+
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+# Backoff between retries: full jitter over an exponential cap, in seconds
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# Model used when no routing rule matches, with web search
+DEFAULT_ROUTE = {"model": "gpt-4o-mini-search-preview", "web_search": True}
+# Routing rules, the first rule whose limits the input fits in is used
+DEFAULT_ROUTING_RULES = [
+    {"max_chars": 1500, "max_rows": 15, "model": "gpt-4o-mini", "web_search": False},
+]
+ROUTING_RULES = json.loads(os.getenv("LLM_ROUTING_RULES", "null")) or DEFAULT_ROUTING_RULES
+
+# Clients, built on first use
+_llm_client = None
+_async_llm_client = None
+
+
+def get_llm_client():
+    """
+    Return the shared OpenAI client, creating it on first use.
+    Returns:
+        llm_client (OpenAI): Client with a pooled HTTP connection and retries handled by chat_completion.
+    """
+    global _llm_client
+    if _llm_client is None:
+        import httpx
+        from openai import OpenAI
+
+        _llm_client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=LLM_BASE_URL,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                timeout=LLM_TIMEOUT,
+            ),
+        )
+    return _llm_client
+
+
+def get_async_llm_client():
+    """
+    Return the shared asynchronous OpenAI client, creating it on first use.
+    Returns:
+        llm_client (AsyncOpenAI): Client with a pooled HTTP connection and retries handled by stream_chat_completion.
+    """
+    global _async_llm_client
+    if _async_llm_client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        _async_llm_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=LLM_BASE_URL,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                timeout=LLM_TIMEOUT,
+            ),
+        )
+    return _async_llm_client
+
+
+def route_model(text: str) -> dict:
+    """
+    Pick the model for an input: small or simple inputs go to a cheaper, faster model without web search.
+    A rule matches when the input has at most max_chars characters and max_rows rows (both optional).
+    JSON inputs (e.g. the tables returned by the table tools, indented with one cell per line) are
+    measured in compact form and their rows are the table rows; other inputs are measured as is and
+    their rows are the lines.
+    Args:
+        text (str): The input to route, e.g. a report segment.
+    Returns:
+        dict: The route, with the "model" to use and whether to enable "web_search".
+    """
+    chars, rows = _input_size(text)
+    for rule in ROUTING_RULES:
+        if chars <= rule.get("max_chars", chars) and rows <= rule.get("max_rows", rows):
+            return {"model": rule["model"], "web_search": rule.get("web_search", False)}
+    return dict(DEFAULT_ROUTE)
+
+
+def _count_rows(value) -> int:
+    """
+    Count the table rows (lists of cells) in a JSON value.
+    """
+    if isinstance(value, dict):
+        return sum(_count_rows(item) for item in value.values())
+    if isinstance(value, list):
+        if all(not isinstance(item, (list, dict)) for item in value):
+            return 1
+        return sum(_count_rows(item) for item in value)
+    return 0
+
+
+def _input_size(text: str) -> tuple[int, int]:
+    """
+    Return the size of an input to route, in characters and rows.
+    """
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return len(text), text.count("\n") + 1
+    if not isinstance(value, (list, dict)):
+        return len(text), text.count("\n") + 1
+    return len(json.dumps(value, separators=(",", ":"))), _count_rows(value)
+
+
+def _retry_delay(attempt: int) -> float:
+    """
+    Return the delay before a retry, with full jitter over an exponential backoff.
+    """
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Return whether a failed call should be retried: timeouts, connection errors, rate limits and server errors.
+    """
+    import openai
+
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+def _completion_arguments(messages: list[dict], model: str, max_tokens: int, web_search: bool, timeout: float | None) -> dict:
+    """
+    Build the arguments of a chat completion call.
+    """
+    arguments = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "timeout": timeout or LLM_TIMEOUT,
+    }
+    if web_search:
+        arguments["web_search_options"] = {"search_context_size": "low"}
+    return arguments
+
+
+def chat_completion(messages: list[dict], model: str | None=None, max_tokens: int=1024, web_search: bool=False, timeout: float | None=None, route_input: str | None=None):
+    """
+    Call the chat completion API, retrying transient failures with jittered backoff.
+    Args:
+        messages (list[dict]): The chat messages.
+        model (str | None): The model to use, routed from route_input (or the default route) if not given.
+        max_tokens (int): Maximum number of tokens to generate.
+        web_search (bool): Enable web search, only used when the model is given.
+        timeout (float | None): Timeout of the call in seconds, LLM_TIMEOUT if not given.
+        route_input (str | None): Input used to route the call to a model when no model is given.
+    Returns:
+        ChatCompletion: The API response.
+    """
+    if model is None:
+        route = route_model(route_input) if route_input is not None else DEFAULT_ROUTE
+        model, web_search = route["model"], route["web_search"]
+    arguments = _completion_arguments(messages, model, max_tokens, web_search, timeout)
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return get_llm_client().chat.completions.create(**arguments)
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning("LLM call failed (%s), retrying in %.2f seconds...", e.__class__.__name__, delay)
+            time.sleep(delay)
+
+
+async def stream_chat_completion(messages: list[dict], model: str | None=None, max_tokens: int=1024, web_search: bool=False, timeout: float | None=None, route_input: str | None=None):
+    """
+    Start a streamed chat completion, retrying transient failures to open the stream with jittered backoff.
+    Args:
+        Same as chat_completion.
+    Returns:
+        AsyncStream: The stream of completion chunks.
+    """
+    if model is None:
+        route = route_model(route_input) if route_input is not None else DEFAULT_ROUTE
+        model, web_search = route["model"], route["web_search"]
+    arguments = _completion_arguments(messages, model, max_tokens, web_search, timeout)
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await get_async_llm_client().chat.completions.create(stream=True, **arguments)
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning("LLM call failed (%s), retrying in %.2f seconds...", e.__class__.__name__, delay)
+            await asyncio.sleep(delay)
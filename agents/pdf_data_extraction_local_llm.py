@@ -1,10 +1,9 @@
 ## this is goind to be a pdf validator agent
 from dotenv import load_dotenv
-import os
 import base64
 import json
 
-from openai import OpenAI
+from llm_client import chat_completion
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
@@ -17,10 +16,6 @@ load_dotenv()
 
 input_pdf_path = "US2__6028061125-121602771.pdf"
 
-llm_client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-)
-
 
 loader = PyPDFLoader(input_pdf_path, mode="single")
 docs = loader.load()  # list of Document objects
@@ -56,11 +51,7 @@ Return ONLY valid JSON or an error JSON.
 Avoid repetition, be concise.
 """
 
-resp = llm_client.chat.completions.create(
-    model="gpt-4o-mini",
-    messages=[{"role":"user","content": prompt}],
-    max_tokens=300
-)
+resp = chat_completion([{"role":"user","content": prompt}], model="gpt-4o-mini", max_tokens=300)
 print(resp.choices[0].message.content)
 
 
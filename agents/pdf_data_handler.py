@@ -79,4 +79,4 @@ def retrieve_chunks(vector_db_path:str, query: str, chunks: int=5) -> list[Docum
             unique_page_numbers.add(page_number)
             filtered_results.append(doc)
 
-    return results
+    return filtered_results
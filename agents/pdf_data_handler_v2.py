@@ -2,29 +2,309 @@
 import os
 import json
 import time
-import pdfplumber
 import re
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime
 
-def extract_tables_from_pdf(pdf_path: str) -> str:
+# stdout is the JSON-RPC channel of the stdio MCP server, diagnostics go through logging (stderr)
+logger = logging.getLogger(__name__)
+
+# Title patterns of the CCMTA report segments, matched against the lower case page text
+# with whitespace collapsed. The keys are the segment ids used in the extracted JSON file.
+SEGMENT_TITLE_PATTERNS = {
+    "header": r"date of rods",
+    "changes_in_drivers_duty_status_intermediate_logs_and_special_driving_conditions": r"changes in driver.?s duty status",
+    "loginlogout_certification_of_rods_data_diagnostics_and_malfunctions": r"login ?/ ?logout",
+    "change_in_drivers_cycle_change_in_operating_zone_offduty_time_deferral": r"change in driver.?s cycle",
+    "comments_remarks_and_annotations": r"comments,? remarks",
+    "additional_hours_not_recorded": r"additional hours not recorded",
+    "engine_power_up_and_shut_down": r"engine power.?up",
+}
+
+# Table detection settings. All the segments are drawn as ruled grids, found from their lines.
+DEFAULT_TABLE_SETTINGS = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+
+# Page types returned by classify_page
+PAGE_SEGMENT = "segment"            # starts at least one segment table
+PAGE_CONTINUATION = "continuation"  # no segment title, but ruled content: continues the previous table
+PAGE_TEXT_ONLY = "text_only"        # cover, signature and other pages without tables
+# Stats only: segment pages parsed from the pypdf layout text
+PAGE_TEXT_SEGMENT = "text_segment"
+
+# Segments holding free text or a key/value block rather than a grid of events. Pages with only
+# these segments are parsed from the pypdf layout text, without pdfplumber layout analysis and
+# table detection. Grid segments (duty status, login/logout, engine power-up...) always go
+# through pdfplumber.
+TEXT_SEGMENTS = {"header", "comments_remarks_and_annotations", "additional_hours_not_recorded"}
+# In the layout text, the cells of a line are separated by two spaces or more
+_LAYOUT_CELL = re.compile(r"\S+(?: \S+)*")
+# A cell belongs to a column if it starts at most this many characters after the column start
+COLUMN_TOLERANCE = 2
+# Page numbers printed in the page footer
+_PAGE_NUMBER = re.compile(r"^\s*page \d+(?:\s*(?:of|/)\s*\d+)?\s*$", re.IGNORECASE)
+
+# A page with fewer ruling operators (rectangles and lines) than this has no table on it
+MIN_RULING_OPERATORS = 4
+_RULING_OPERATORS = re.compile(rb"\s(?:re|l)\s")
+
+
+def classify_page(page_text: str, page_content: bytes) -> tuple[str, str | None]:
     """
-    Extract text from a PDF file.
+    Classify a page with a cheap text and content stream scan, without any layout analysis.
     Args:
-        pdf_path (str): Path to the PDF file.
+        page_text (str): Text of the page, lower case with whitespace collapsed.
+        page_content (bytes): Raw content stream of the page.
+    Returns:
+        tuple[str, str | None]: The page type and the id of the first segment that starts on the page.
+    """
+    first_segment = None
+    first_position = None
+    for segment_id, pattern in SEGMENT_TITLE_PATTERNS.items():
+        match = re.search(pattern, page_text)
+        if match and (first_position is None or match.start() < first_position):
+            first_segment = segment_id
+            first_position = match.start()
+    if first_segment is not None:
+        return PAGE_SEGMENT, first_segment
+    if len(_RULING_OPERATORS.findall(page_content)) >= MIN_RULING_OPERATORS:
+        return PAGE_CONTINUATION, None
+    return PAGE_TEXT_ONLY, None
+
+
+def _table_title(table_id: str) -> str:
+    """
+    Return the key of a segment table from its title cell: the first words joined with
+    underscores, without special characters.
+    """
+    words = table_id.replace(" ", "_").lower().split("_")
+    return re.sub('[^a-z0-9_]+', '', "_".join(words[:11]))
+
+
+def _layout_cells(line: str) -> list[tuple[int, str]]:
+    """
+    Split a line of layout text into its cells, with the position where each cell starts.
+    """
+    return [(match.start(), match.group()) for match in _LAYOUT_CELL.finditer(line)]
+
+
+def _line_segment(line: str) -> str | None:
+    """
+    Return the id of the segment whose title is on a line of layout text, if any.
+    """
+    normalized = re.sub(r"\s+", " ", line.lower())
+    for segment_id, pattern in SEGMENT_TITLE_PATTERNS.items():
+        if re.search(pattern, normalized):
+            return segment_id
+    return None
+
+
+def _parse_layout_rows(column_cells: list[tuple[int, str]], lines: list[str]) -> list | None:
+    """
+    Parse the lines of a text segment into table rows, using the cells of its column header
+    line as the column positions. Blank lines separate the rows. The line holding the first
+    column cell of a row can be above, among or below the lines of its wrapped cells (top,
+    middle or bottom aligned cells), so all the lines of a row are joined in order.
+    The layout text has no table rules, so a line below the table starting at the first column
+    (e.g. a "Printed by" footer) cannot be told apart from a row with only a first cell.
+    Returns:
+        list | None: The rows, or None if a cell does not start at a column position, if lines
+            not separated by a blank line hold several first column cells and wrapped text (their
+            rows cannot be told apart) or none, or if a row has only its first cell.
+    """
+    starts = [start for start, _ in column_cells]
+    blocks = [[]]
+    for line in lines:
+        if not line.strip():
+            blocks.append([])
+        elif not _PAGE_NUMBER.match(line):
+            blocks[-1].append(line)
+
+    rows = []
+    for block in filter(None, blocks):
+        placed_lines = []
+        for line in block:
+            cells = _layout_cells(line)
+            columns = []
+            for start, _ in cells:
+                column = next((i for i, column_start in enumerate(starts) if abs(start - column_start) <= COLUMN_TOLERANCE), None)
+                if column is None or column in columns:
+                    return None
+                columns.append(column)
+            placed_lines.append(list(zip(cells, columns)))
+
+        first_column_lines = sum(placed[0][1] == 0 for placed in placed_lines)
+        if first_column_lines == len(placed_lines):
+            # rows without wrapped text, not separated by blank lines
+            row_blocks = [[placed] for placed in placed_lines]
+        elif first_column_lines == 1:
+            row_blocks = [placed_lines]
+        else:
+            return None
+        for row_lines in row_blocks:
+            row = [""] * len(starts)
+            for placed in row_lines:
+                for (_, text), column in placed:
+                    row[column] = f"{row[column]}\n{text}" if row[column] else text
+            if len(row) > 1 and not any(row[1:]):
+                return None
+            rows.append(row)
+    return rows
+
+
+def parse_text_segments(layout_text: str, continued_segment: str | None) -> list[tuple[str, list]] | None:
+    """
+    Parse the text segments of a page from its pypdf layout text, in the same shape as the tables
+    found by pdfplumber: the header table with its label row first, the other segments with their
+    column header row first.
+    Args:
+        layout_text (str): Text of the page extracted with extraction_mode="layout".
+        continued_segment (str | None): The segment the previous page ended with.
     Returns:
-        str: Extracted text from the PDF.
+        list[tuple[str, list]] | None: The table title and rows of each segment on the page, or None
+            if the page holds a grid segment, continues a table, or does not fit the text layout
+            (the page then goes through pdfplumber).
+    """
+    blocks = []
+    for line in layout_text.splitlines():
+        if not line.strip():
+            # blank lines separate the rows of a table
+            if blocks and blocks[-1][1] is not None:
+                blocks[-1][2].append(line)
+            continue
+        segment_id = _line_segment(line)
+        if segment_id is not None:
+            if segment_id not in TEXT_SEGMENTS:
+                return None
+            title_cell = _layout_cells(line)[0][1]
+            if segment_id == "header":
+                # the header has no title row, its label row holds the "date of rods" title
+                blocks.append(["header", line, []])
+            else:
+                blocks.append([_table_title(title_cell), None, []])
+        elif blocks:
+            if blocks[-1][1] is None:
+                blocks[-1][1] = line
+            else:
+                blocks[-1][2].append(line)
+        elif continued_segment is not None and len(_layout_cells(line)) > 1:
+            # rows before the first title continue the table of the previous page
+            return None
+
+    tables = []
+    for table_title, column_line, lines in blocks:
+        if column_line is None:
+            return None
+        column_cells = _layout_cells(column_line)
+        rows = _parse_layout_rows(column_cells, lines)
+        if rows is None:
+            return None
+        tables.append((table_title, [[text for _, text in column_cells]] + rows))
+    return tables
+
+
+def _scan_page(reader_page) -> tuple[str, bytes]:
+    """
+    Return the normalized text and the raw content stream of a pypdf page.
+    """
+    page_text = re.sub(r"\s+", " ", (reader_page.extract_text() or "").lower())
+    contents = reader_page.get_contents()
+    page_content = contents.get_data() if contents is not None else b""
+    return page_text, page_content
+
+
+def iter_tables_from_pdf(pdf_path: str, classify: bool=True, stats: dict | None=None, templates: dict | None=None, fast_text: bool=True):
+    """
+    Extract tables from a PDF file one page at a time.
+    Every page is first classified with a fast pypdf scan, and the costly pdfplumber table
+    detection only runs on pages that start or continue a segment table.
+    The cached layout objects of each page are released once the page is processed,
+    so memory use does not grow with the number of pages.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        classify (bool): Skip table detection on text only pages. When False every page goes
+            through full table detection, the classification is only used for the stats.
+        stats (dict | None): If given, filled with the number of pages and seconds spent per page type.
+        templates (dict | None): Known vendor layout templates (see agents.layout_templates). When the
+            report matches one, segment tables are cropped and split on the template columns instead
+            of running full table detection.
+        fast_text (bool): Parse the pages holding only text segments (see TEXT_SEGMENTS) from the
+            pypdf layout text instead of running pdfplumber on them. Only used when classify is True.
+    Yields:
+        tuple[str, str, list]: The logs date, the table title and the table rows.
     """
+    # pdfplumber (and pdfminer underneath) is only imported when a PDF is actually processed
+    import pdfplumber
+    from pypdf import PdfReader
+
+    if stats is None:
+        stats = {}
+    reader = PdfReader(pdf_path)
     logs_date = "2023-10-01"  # Default value for logs_date
-    pdf_tables = {}
+    continued_segment = None
+    template = None
+    template_checked = False
     with pdfplumber.open(pdf_path) as pdf:
         total_pages = len(pdf.pages)
         current_page = 0
-        for page in pdf.pages:
+        for page, reader_page in zip(pdf.pages, reader.pages):
             current_page += 1
             print(f"Processing page {current_page} of {total_pages}...")
-            # Extract text from pdf page
-            txt = page.extract_text().lower() if page.extract_text() else ""
-            # extract tables from pdf page
-            tables = page.extract_tables()
+            page_start = time.perf_counter()
+            page_text, page_content = _scan_page(reader_page)
+            page_type, first_segment = classify_page(page_text, page_content)
+
+            # the layout of the report is fingerprinted on its first header table, even when that
+            # page goes through the text fast path
+            if classify and templates and not template_checked and re.search(SEGMENT_TITLE_PATTERNS["header"], page_text):
+                from agents.layout_templates import match_layout_template
+
+                template = match_layout_template(page, templates)
+                template_checked = True
+                logger.info("Layout template: %s", template["vendor"] if template else "no match, using full table detection")
+
+            text_tables = None
+            if fast_text and classify and first_segment in TEXT_SEGMENTS and not any(
+                re.search(pattern, page_text) for segment_id, pattern in SEGMENT_TITLE_PATTERNS.items() if segment_id not in TEXT_SEGMENTS
+            ):
+                text_tables = parse_text_segments(reader_page.extract_text(extraction_mode="layout"), continued_segment)
+
+            if text_tables is not None:
+                for table_title, data_table in text_tables:
+                    if table_title == "header" and len(data_table) > 1:
+                        logs_date = data_table[1][0]
+                    if "unidentified driver profile" in page_text:
+                        logs_date = "unidentified_driver"
+                    if table_title in SEGMENT_TITLE_PATTERNS:
+                        continued_segment = table_title
+                    yield logs_date, table_title, data_table
+                page_type = PAGE_TEXT_SEGMENT
+                tables = []
+            elif page_type == PAGE_TEXT_ONLY and classify:
+                tables = []
+                txt = page_text
+            elif classify:
+                txt = page_text
+                tables = None
+                if template is not None:
+                    from agents.layout_templates import extract_tables_with_template
+
+                    tables = extract_tables_with_template(page, template, continued_segment)
+                    if tables is None:
+                        logger.info("Page %d does not fit the layout template, using full table detection", current_page)
+                if tables is None:
+                    # extract tables from pdf page
+                    tables = page.extract_tables(DEFAULT_TABLE_SETTINGS)
+            else:
+                # Extract text from pdf page
+                txt = page.extract_text() or ""
+                txt = txt.lower()
+                # extract tables from pdf page
+                tables = page.extract_tables()
             for tbl in tables:
                 if not tbl:
                     continue
@@ -43,48 +323,194 @@ def extract_tables_from_pdf(pdf_path: str) -> str:
                             table_title = table_id if table_id and len(table_id)>0 else table_title
                             data_table = tbl[1:][:]  # Skip the first row which is the header
                             # remove special characters from the table title and put all words together
-                            words = table_title.replace(" ", "_").lower().split("_")
-                            table_title = "_".join(words[:11])
-                            table_title = re.sub('[^a-z0-9_]+', '', table_title)
+                            table_title = _table_title(table_title)
 
                     if "unidentified driver profile" in txt:
                         logs_date = "unidentified_driver"
 
-                    if logs_date not in pdf_tables:
-                        pdf_tables[logs_date] = {}
-                    if table_title not in pdf_tables[logs_date]:
-                        pdf_tables[logs_date][table_title] = []
                     # add data only if two or more columns contain data
                     for row in data_table:
                         if all(cell is None or cell.strip() == "" for cell in row):
                             data_table.remove(row)
-                    pdf_tables[logs_date][table_title].append(data_table)
                 except Exception as e:
                     print(f"Error extracting table on page {page.page_number}: {e}")
                     print(f"Table content: {tbl}")
                     continue
+                if table_title in SEGMENT_TITLE_PATTERNS:
+                    continued_segment = table_title
+                yield logs_date, table_title, data_table
+            # release the parsed layout objects of the page before moving to the next one
+            page.close()
+            # pdfminer keeps every parsed PDF object (including decoded content streams) in a
+            # document level cache, drop it so it does not grow with the page count
+            cached_objs = getattr(pdf.doc, "_cached_objs", None)
+            if cached_objs is not None:
+                cached_objs.clear()
+            # pypdf does the same with every object it resolved for the page scan (content streams, fonts)
+            reader.resolved_objects.clear()
+
+            page_stats = stats.setdefault(page_type, {"pages": 0, "seconds": 0.0})
+            page_stats["pages"] += 1
+            page_stats["seconds"] += time.perf_counter() - page_start
+
+
+def print_page_stats(stats: dict, baseline: dict | None=None) -> None:
+    """
+    Print the pages and time spent per page type, and the time saved against a baseline run.
+    Args:
+        stats (dict): Stats filled by iter_tables_from_pdf.
+        baseline (dict | None): Stats of a run with classify=False on the same PDF.
+    """
+    for page_type, page_stats in sorted(stats.items()):
+        line = f"{page_type:13s}: {page_stats['pages']:5d} pages, {page_stats['seconds']:8.3f} s"
+        if baseline and page_type in baseline:
+            saved = baseline[page_type]["seconds"] - page_stats["seconds"]
+            line += f", saved {saved:8.3f} s"
+        print(line)
+
+
+def extract_tables_from_pdf(pdf_path: str, classify: bool=True, stats: dict | None=None, templates: dict | None=None, fast_text: bool=True) -> dict:
+    """
+    Extract tables from a PDF file.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        classify (bool): Skip table detection on pages without segment tables.
+        stats (dict | None): If given, filled with the number of pages and seconds spent per page type.
+        templates (dict | None): Known vendor layout templates, see iter_tables_from_pdf.
+        fast_text (bool): Parse text segment pages from the pypdf layout text, see iter_tables_from_pdf.
+    Returns:
+        dict: Extracted tables, keyed by logs date and table title.
+    """
+    pdf_tables = {}
+    for logs_date, table_title, data_table in iter_tables_from_pdf(pdf_path, classify=classify, stats=stats, templates=templates, fast_text=fast_text):
+        if logs_date not in pdf_tables:
+            pdf_tables[logs_date] = {}
+        if table_title not in pdf_tables[logs_date]:
+            pdf_tables[logs_date][table_title] = []
+        pdf_tables[logs_date][table_title].append(data_table)
     return pdf_tables
 
 
-def create_retrieval_data(pdf_path: str, output_file: str="pdf_tables.json") -> None:
+# Extractions in progress, keyed by PDF path, PDF content hash and output format.
+# Concurrent requests for the same PDF wait for the extraction in progress instead of running their own.
+_inflight_extractions = {}
+_inflight_lock = threading.Lock()
+
+
+def file_content_hash(file_path: str) -> str:
+    """
+    Return the hash of the content of a file, read in blocks.
+    """
+    h = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# Permission bits masked from created files. Read once at import, os.umask can only be read by
+# setting it, which would race with the files created by the extraction threads.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(output_file: str):
+    """
+    Open a temporary file next to output_file for writing, and rename it to output_file once closed.
+    Readers of output_file see either the previous content or the complete new one, never a partial write.
+    If writing fails the temporary file is removed and output_file is left untouched.
+    output_file gets the permissions of a plain open(): those of the replaced file if it exists,
+    otherwise 0o666 minus the umask (mkstemp creates the temporary file as 0o600).
+    """
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)), prefix=os.path.basename(output_file) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            yield f
+        try:
+            mode = os.stat(output_file).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(temp_file, mode)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def create_retrieval_data(pdf_path: str, output_file: str="pdf_tables.json", stream: bool=False, templates: dict | None=None) -> str:
     """
     Extract tables from a PDF file and save them to a JSON file.
+    Concurrent calls for the same PDF (same path and content) share a single extraction.
     Args:
         pdf_path (str): Path to the PDF file.
         output_file (str): Path to the output JSON file.
+        stream (bool): Write each table to a JSON Lines file as soon as its page is processed,
+            instead of building the whole report in memory.
+        templates (dict | None): Known vendor layout templates, see iter_tables_from_pdf.
+    Returns:
+        str: Path to the output file.
+    """
+    key = (os.path.abspath(pdf_path), file_content_hash(pdf_path), stream)
+    with _inflight_lock:
+        extraction = _inflight_extractions.get(key)
+        leader = extraction is None
+        if leader:
+            extraction = _inflight_extractions[key] = Future()
+    if not leader:
+        return extraction.result()
+
+    try:
+        if stream:
+            extraction.set_result(stream_retrieval_data(pdf_path, templates=templates))
+        else:
+            extraction.set_result(_write_retrieval_data(pdf_path, templates=templates))
+    except BaseException as e:
+        extraction.set_exception(e)
+    finally:
+        with _inflight_lock:
+            del _inflight_extractions[key]
+    return extraction.result()
+
+
+def _write_retrieval_data(pdf_path: str, templates: dict | None=None) -> str:
+    """
+    Extract tables from a PDF file and save them to a JSON file next to it.
     """
-    tables = extract_tables_from_pdf(pdf_path)
+    tables = extract_tables_from_pdf(pdf_path, templates=templates)
 
     # output file will be in the same directory as the PDF file
     output_file = os.path.splitext(pdf_path)[0] + "_tables.json"
     
     # Save the extracted tables to a JSON file
-    with open(output_file, "w") as f:
+    with atomic_write(output_file) as f:
         json.dump(tables, f, indent=4)
     
     return output_file #if os.path.exists(output_file) else None
 
 
+def stream_retrieval_data(pdf_path: str, templates: dict | None=None) -> str:
+    """
+    Extract tables from a PDF file and write them to a JSON Lines file as they are extracted.
+    Each line holds one table: {"date": logs date, "segment": table title, "rows": table rows}.
+    Peak memory stays flat regardless of the number of pages in the report.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        templates (dict | None): Known vendor layout templates, see iter_tables_from_pdf.
+    Returns:
+        str: Path to the output JSON Lines file.
+    """
+    # output file will be in the same directory as the PDF file
+    output_file = os.path.splitext(pdf_path)[0] + "_tables.jsonl"
+
+    # written to a temporary file, readers never see a partially extracted report
+    with atomic_write(output_file) as f:
+        for logs_date, table_title, data_table in iter_tables_from_pdf(pdf_path, templates=templates):
+            f.write(json.dumps({"date": logs_date, "segment": table_title, "rows": data_table}) + "\n")
+
+    return output_file
+
 
 
 
@@ -92,10 +518,14 @@ def retrieve_table_data(data_file_path: str, table_id: str) -> list[str]:
     """
     Retrieve table data by table ID.
     Args:
+        data_file_path (str): Path to the JSON (or streamed JSON Lines) file created by create_retrieval_data.
         table_id (str): The ID of the table to retrieve.
     Returns:
         list[str]: List of strings representing the table data.
     """
+    if data_file_path.endswith(".jsonl"):
+        return _retrieve_streamed_table_data(data_file_path, table_id)
+
     # Load the JSON file containing the extracted tables
     with open(data_file_path, "r") as f:
         tables = json.load(f)
@@ -109,6 +539,66 @@ def retrieve_table_data(data_file_path: str, table_id: str) -> list[str]:
     return data
 
 
+def _retrieve_streamed_table_data(data_file_path: str, table_id: str) -> list[str]:
+    """
+    Retrieve table data by table ID from a JSON Lines file, reading one table at a time.
+    The result has the same shape as the one returned for JSON files.
+    """
+    data_by_date = {}
+    with open(data_file_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["segment"] != table_id:
+                continue
+            data_by_date.setdefault(record["date"], []).append(record["rows"])
+
+    return list(data_by_date.values())
+
+
+def load_retrieval_data(data_file_path: str) -> dict:
+    """
+    Load all the tables of a file created by create_retrieval_data.
+    Args:
+        data_file_path (str): Path to the JSON (or streamed JSON Lines) file.
+    Returns:
+        dict: The tables keyed by logs date and table title, as returned by extract_tables_from_pdf.
+    """
+    if not data_file_path.endswith(".jsonl"):
+        with open(data_file_path, "r") as f:
+            return json.load(f)
+
+    tables = {}
+    with open(data_file_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            tables.setdefault(record["date"], {}).setdefault(record["segment"], []).append(record["rows"])
+    return tables
+
+
+# Formats of the logs dates found in the header tables
+LOGS_DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y", "%b %d, %Y", "%B %d, %Y", "%d-%b-%Y"]
+
+
+def parse_logs_date(logs_date: str) -> date | None:
+    """
+    Parse a logs date key of an extracted report.
+    Args:
+        logs_date (str): The logs date, as found in the header table.
+    Returns:
+        date | None: The date, or None if it is not a date (e.g. "unidentified_driver").
+    """
+    for date_format in LOGS_DATE_FORMATS:
+        try:
+            return datetime.strptime(logs_date.strip(), date_format).date()
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
 if __name__ == "__main__":
     # Example usage
     start_time = time.time()
@@ -4,7 +4,7 @@ import os
 import base64
 import json
 
-from openai import OpenAI
+from llm_client import chat_completion
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
@@ -17,10 +17,6 @@ load_dotenv()
 
 input_pdf_path = "US2__6028061125-121602771.pdf"
 
-llm_client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-)
-
 
 loader = PyPDFLoader(input_pdf_path, mode="single")
 docs = loader.load()  # list of Document objects
@@ -71,15 +67,7 @@ messages = [
     )}
 ]
 
-resp = llm_client.chat.completions.create(
-    model="gpt-4o-mini-search-preview",
-    messages=messages,
-    max_tokens=300,
-    web_search_options={
-        "search_context_size": "low",
-    },
-
-)
+resp = chat_completion(messages, max_tokens=300, route_input=context)
 print(resp.choices[0].message.content)
 
 
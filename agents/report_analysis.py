@@ -0,0 +1,281 @@
+## cross-segment consistency checks of an extracted report
+# Some checks span several segments and every date of a report, which an LLM cannot do reliably one
+# chunk at a time: odometer and engine hours monotonicity across the engine power-up/shut-down and
+# duty status events, login/logout pairing and certification of every date. All the segments of an
+# extracted report are loaded into aligned columnar arrays and the checks run in batch over them.
+import re
+import time
+
+import numpy as np
+
+from agents.pdf_data_handler_v2 import load_retrieval_data, parse_logs_date
+
+DUTY_STATUS_SEGMENT = "changes_in_drivers_duty_status_intermediate_logs_and_special_driving_conditions"
+LOGIN_SEGMENT = "loginlogout_certification_of_rods_data_diagnostics_and_malfunctions"
+ENGINE_SEGMENT = "engine_power_up_and_shut_down"
+# Logs date of the unidentified driver records, which have no date of their own
+UNIDENTIFIED_DATE = "unidentified_driver"
+
+# Column header patterns, matched against the lower case header cells
+COLUMN_PATTERNS = {
+    "time": r"\btime\b",
+    "event": r"event|status|type|description",
+    "odometer": r"odometer|distance|\bkm\b|\bmiles\b",
+    "engine_hours": r"engine hours|eng\.? ?h(ou)?rs?",
+}
+
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([ap]\.?m\.?)?", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+def _parse_date(value: str) -> int:
+    """
+    Return the ordinal of a logs date, or -1 if it cannot be parsed.
+    """
+    parsed = parse_logs_date(value)
+    return parsed.toordinal() if parsed is not None else -1
+
+
+def _parse_minutes(value) -> float:
+    """
+    Return the minutes since midnight of a time cell, or NaN if it has no time.
+    """
+    match = TIME_PATTERN.search(value or "")
+    if not match:
+        return np.nan
+    hours, minutes, seconds, meridiem = match.groups()
+    hours = int(hours) % 24
+    if meridiem and meridiem.lower().startswith("p") and hours < 12:
+        hours += 12
+    elif meridiem and meridiem.lower().startswith("a") and hours == 12:
+        hours = 0
+    return hours * 60 + int(minutes) + int(seconds or 0) / 60
+
+
+def _parse_number(value) -> float:
+    """
+    Return the number in a cell, or NaN if it has none.
+    """
+    match = NUMBER_PATTERN.search(value or "")
+    return float(match.group().replace(",", "")) if match else np.nan
+
+
+def _find_columns(rows: list) -> tuple[int, dict]:
+    """
+    Find the column header row of a segment table and the index of each known column.
+    A column header row only holds labels and names at least two known columns. Continuation
+    tables start with a data row (times, readings, events such as "duty status - on duty"),
+    the search stops there.
+    Returns:
+        tuple[int, dict]: Index of the header row (-1 if none) and the column index of each known column.
+    """
+    for row_index, row in enumerate(rows[:3]):
+        cells = [re.sub(r"\s+", " ", (cell or "").lower()) for cell in row]
+        if any(TIME_PATTERN.search(cell) or NUMBER_PATTERN.search(cell) for cell in cells):
+            break
+        columns = {}
+        for name, pattern in COLUMN_PATTERNS.items():
+            for column_index, cell in enumerate(cells):
+                if column_index not in columns.values() and re.search(pattern, cell):
+                    columns[name] = column_index
+                    break
+        if len(columns) >= 2:
+            return row_index, columns
+    return -1, {}
+
+
+def _cell(row: list, header_columns: dict, name: str):
+    """
+    Return the cell of a known column in a row, or None if the table has no such column.
+    """
+    column_index = header_columns.get(name)
+    return row[column_index] if column_index is not None and column_index < len(row) else None
+
+
+def load_report_columns(report: dict) -> dict:
+    """
+    Load the segments of an extracted report into aligned columnar arrays.
+    Args:
+        report (dict): The tables keyed by logs date and segment id, as returned by load_retrieval_data.
+    Returns:
+        dict: For each segment id, the arrays "date" (logs date), "day" (date ordinal, -1 if unknown),
+            "minutes", "odometer", "engine_hours" (NaN if missing), "event" (lower case) and "order"
+            (position of the row in the report), all with one entry per row.
+    """
+    columns = {}
+    order = 0
+    for logs_date, segments in report.items():
+        day = _parse_date(logs_date)
+        for segment_id, tables in segments.items():
+            data = columns.setdefault(segment_id, {key: [] for key in ("date", "day", "minutes", "odometer", "engine_hours", "event", "order")})
+            header_columns = {}
+            for table in tables:
+                header_index, found = _find_columns(table)
+                # continuation tables have no column header, they reuse the previous one
+                if found:
+                    header_columns = found
+                for row in table[header_index + 1:]:
+                    if not row:
+                        continue
+                    data["date"].append(logs_date)
+                    data["day"].append(day)
+                    data["minutes"].append(_parse_minutes(_cell(row, header_columns, "time")))
+                    data["odometer"].append(_parse_number(_cell(row, header_columns, "odometer")))
+                    data["engine_hours"].append(_parse_number(_cell(row, header_columns, "engine_hours")))
+                    data["event"].append((_cell(row, header_columns, "event") or "").lower())
+                    data["order"].append(order)
+                    order += 1
+
+    for data in columns.values():
+        data["date"] = np.array(data["date"], dtype=object)
+        data["day"] = np.array(data["day"], dtype=np.int64)
+        data["minutes"] = np.array(data["minutes"], dtype=np.float64)
+        data["odometer"] = np.array(data["odometer"], dtype=np.float64)
+        data["engine_hours"] = np.array(data["engine_hours"], dtype=np.float64)
+        data["event"] = np.array(data["event"], dtype=object)
+        data["order"] = np.array(data["order"], dtype=np.int64)
+    return columns
+
+
+def _empty_columns() -> dict:
+    """
+    Return the arrays of a segment without rows.
+    """
+    return {
+        "date": np.array([], dtype=object), "day": np.array([], dtype=np.int64),
+        "minutes": np.array([], dtype=np.float64), "odometer": np.array([], dtype=np.float64),
+        "engine_hours": np.array([], dtype=np.float64), "event": np.array([], dtype=object),
+        "order": np.array([], dtype=np.int64),
+    }
+
+
+def _timeline(columns: dict, segment_ids: list[str]) -> tuple[dict, np.ndarray]:
+    """
+    Concatenate the rows of several segments and sort them chronologically.
+    Rows of unknown dates are ordered by their position in the report.
+    Returns:
+        tuple[dict, np.ndarray]: The concatenated arrays in chronological order and the segment of each row.
+    """
+    parts = [columns.get(segment_id, _empty_columns()) for segment_id in segment_ids]
+    merged = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    segments = np.concatenate([np.full(len(part["order"]), segment_id, dtype=object) for part, segment_id in zip(parts, segment_ids)])
+    # sort by date, then time (rows without a time keep their report order), then report order
+    minutes = np.where(np.isnan(merged["minutes"]), -1, merged["minutes"])
+    sort_order = np.lexsort((merged["order"], minutes, merged["day"]))
+    return {key: values[sort_order] for key, values in merged.items()}, segments[sort_order]
+
+
+def check_monotonic(columns: dict, field: str) -> list[dict]:
+    """
+    Find the readings of a counter (odometer or engine hours) lower than the previous reading,
+    across the engine power-up/shut-down and duty status events of all the dates.
+    Args:
+        columns (dict): The report arrays returned by load_report_columns.
+        field (str): "odometer" or "engine_hours".
+    Returns:
+        list[dict]: One finding per decreasing reading.
+    """
+    timeline, segments = _timeline(columns, [ENGINE_SEGMENT, DUTY_STATUS_SEGMENT])
+    known = ~np.isnan(timeline[field]) & (timeline["date"] != UNIDENTIFIED_DATE)
+    values = timeline[field][known]
+    if len(values) < 2:
+        return []
+    decreasing = np.flatnonzero(np.diff(values) < 0) + 1
+    rows = np.flatnonzero(known)
+    findings = []
+    for i in decreasing:
+        previous, current = rows[i - 1], rows[i]
+        findings.append({
+            "check": f"{field}_monotonicity",
+            "date": timeline["date"][current],
+            "segment": segments[current],
+            "message": (
+                f"{field} decreases from {values[i - 1]} ({timeline['date'][previous]}, {segments[previous]}) "
+                f"to {values[i]} ({timeline['date'][current]}, {segments[current]})"
+            ),
+        })
+    return findings
+
+
+def check_login_pairing(columns: dict) -> list[dict]:
+    """
+    Find logins not followed by a logout (and logouts not preceded by a login) across all the dates.
+    Args:
+        columns (dict): The report arrays returned by load_report_columns.
+    Returns:
+        list[dict]: One finding per unpaired login or logout.
+    """
+    timeline, _ = _timeline(columns, [LOGIN_SEGMENT])
+    # np.char.replace fails on an empty array
+    if len(timeline["event"]) == 0:
+        return []
+    # "log-in", "log in" and "login" are the same event
+    events = np.char.replace(np.char.replace(timeline["event"].astype(str), "-", ""), " ", "")
+    is_logout = np.char.find(events, "logout") >= 0
+    is_login = (np.char.find(events, "login") >= 0) & ~is_logout
+    paired = is_login | is_logout
+    codes = np.where(is_login, 1, -1)[paired]
+    rows = np.flatnonzero(paired)
+    findings = []
+    # two logins (or two logouts) in a row
+    for i in np.flatnonzero(codes[1:] == codes[:-1]) + 1:
+        kind = "login" if codes[i] == 1 else "logout"
+        findings.append({
+            "check": "login_logout_pairing",
+            "date": timeline["date"][rows[i]],
+            "segment": LOGIN_SEGMENT,
+            "message": f"{kind} at {timeline['date'][rows[i]]} follows another {kind} without a matching " + ("logout" if kind == "login" else "login"),
+        })
+    return findings
+
+
+def check_certification_coverage(report: dict, columns: dict) -> list[dict]:
+    """
+    Find the dates of the report without any certification event.
+    Args:
+        report (dict): The tables keyed by logs date and segment id.
+        columns (dict): The report arrays returned by load_report_columns.
+    Returns:
+        list[dict]: One finding per uncertified date.
+    """
+    dates = np.array([d for d in report if d != UNIDENTIFIED_DATE], dtype=object)
+    login = columns.get(LOGIN_SEGMENT, _empty_columns())
+    certified = login["date"][np.char.find(login["event"].astype(str), "certif") >= 0]
+    uncertified = dates[~np.isin(dates, certified)]
+    return [
+        {"check": "certification_coverage", "date": d, "segment": LOGIN_SEGMENT, "message": f"no certification of RODS for {d}"}
+        for d in uncertified
+    ]
+
+
+def analyze_report(data_file_path: str) -> dict:
+    """
+    Run all the cross-segment consistency checks on an extracted report.
+    Args:
+        data_file_path (str): Path to the file created by create_retrieval_data.
+    Returns:
+        dict: The "findings" of all the checks and the number of findings per check in "summary".
+    """
+    report = load_retrieval_data(data_file_path)
+    columns = load_report_columns(report)
+    findings = (
+        check_monotonic(columns, "odometer")
+        + check_monotonic(columns, "engine_hours")
+        + check_login_pairing(columns)
+        + check_certification_coverage(report, columns)
+    )
+    summary = {}
+    for finding in findings:
+        summary[finding["check"]] = summary.get(finding["check"], 0) + 1
+    return {"findings": findings, "summary": summary}
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+
+    data_file_path = sys.argv[1] if len(sys.argv) > 1 else "US2__6028061125-121602771_tables.json"
+    start_time = time.time()
+    analysis = analyze_report(data_file_path)
+    print(json.dumps(analysis["summary"], indent=4))
+    print(f"Analysis took {time.time() - start_time:.4f} seconds.")
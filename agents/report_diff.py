@@ -0,0 +1,189 @@
+## diff and revalidation of re-submitted driver reports
+# Drivers and carriers often re-export a report after a few edits. The extracted tables of both
+# exports are compared per date and per segment with row hashes, and only the segments that
+# changed are validated again; the stored results of the other segments are reused.
+import os
+import json
+import hashlib
+from collections import Counter
+
+from agents.pdf_data_handler_v2 import load_retrieval_data, atomic_write
+
+
+def row_hash(row: list) -> str:
+    """
+    Return the hash of a table row.
+    """
+    return hashlib.sha1(json.dumps(row).encode()).hexdigest()
+
+
+def segment_hash(tables: list) -> str:
+    """
+    Return the hash of all the tables of a segment.
+    """
+    return hashlib.sha1(json.dumps(tables).encode()).hexdigest()
+
+
+def result_key(logs_date: str, segment_id: str, tables: list) -> str:
+    """
+    Return the key of the stored validation result of a segment. The validated chunk holds the
+    date and the segment id, so identical tables on another date or in another segment are
+    validated on their own.
+    """
+    return f"{logs_date}/{segment_id}/{segment_hash(tables)}"
+
+
+def _segment_rows(tables: list) -> list:
+    """
+    Return the rows of all the tables of a segment, in order.
+    """
+    return [row for table in tables for row in table]
+
+
+def diff_segment(old_tables: list, new_tables: list) -> dict:
+    """
+    Compare the rows of a segment in two exports of a report.
+    Rows with the same hash are unchanged. The remaining rows are paired by their first cell
+    (event sequence or time) to find the changed ones, the others were added or removed.
+    Args:
+        old_tables (list): The tables of the segment in the previous export.
+        new_tables (list): The tables of the segment in the new export.
+    Returns:
+        dict: The "added", "removed" and "changed" ({"old", "new"}) rows and the number of "unchanged" rows.
+    """
+    old_rows = _segment_rows(old_tables)
+    new_rows = _segment_rows(new_tables)
+
+    # rows present in both exports, counting duplicates
+    common = Counter(map(row_hash, old_rows)) & Counter(map(row_hash, new_rows))
+    unchanged = sum(common.values())
+
+    def unmatched(rows):
+        remaining = common.copy()
+        result = []
+        for row in rows:
+            h = row_hash(row)
+            if remaining[h] > 0:
+                remaining[h] -= 1
+            else:
+                result.append(row)
+        return result
+
+    removed = unmatched(old_rows)
+    added = unmatched(new_rows)
+
+    # a removed and an added row with the same first cell are the same row, changed
+    changed = []
+    removed_by_key = {}
+    for row in removed:
+        removed_by_key.setdefault(row[0] if row else None, []).append(row)
+    still_added = []
+    for row in added:
+        candidates = removed_by_key.get(row[0] if row else None)
+        if candidates:
+            changed.append({"old": candidates.pop(0), "new": row})
+        else:
+            still_added.append(row)
+    still_removed = [row for rows in removed_by_key.values() for row in rows]
+
+    return {"added": still_added, "removed": still_removed, "changed": changed, "unchanged": unchanged}
+
+
+def diff_reports(old_data_file_path: str, new_data_file_path: str) -> dict:
+    """
+    Compare two exports of a report, per date and per segment.
+    Args:
+        old_data_file_path (str): Path to the file created by create_retrieval_data for the previous export.
+        new_data_file_path (str): Path to the file created by create_retrieval_data for the new export.
+    Returns:
+        dict: The diff of every segment with changes, keyed by logs date and segment id,
+            and the total number of "added", "removed", "changed" and "unchanged" rows in "summary".
+    """
+    old_report = load_retrieval_data(old_data_file_path)
+    new_report = load_retrieval_data(new_data_file_path)
+
+    dates = {}
+    summary = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+    for logs_date in list(old_report) + [d for d in new_report if d not in old_report]:
+        old_segments = old_report.get(logs_date, {})
+        new_segments = new_report.get(logs_date, {})
+        for segment_id in list(old_segments) + [s for s in new_segments if s not in old_segments]:
+            diff = diff_segment(old_segments.get(segment_id, []), new_segments.get(segment_id, []))
+            for key in ("added", "removed", "changed"):
+                summary[key] += len(diff[key])
+            summary["unchanged"] += diff["unchanged"]
+            if diff["added"] or diff["removed"] or diff["changed"]:
+                dates.setdefault(logs_date, {})[segment_id] = diff
+
+    return {"dates": dates, "summary": summary}
+
+
+def validation_results_path(data_file_path: str) -> str:
+    """
+    Return the path of the stored validation results of an extracted report.
+    """
+    return os.path.splitext(data_file_path)[0] + "_validation.json"
+
+
+def _load_validation_results(data_file_path: str) -> dict:
+    """
+    Load the stored validation results of an extracted report, keyed by result_key.
+    """
+    results_path = validation_results_path(data_file_path)
+    if not os.path.exists(results_path):
+        return {}
+    with open(results_path, "r") as f:
+        return json.load(f)["results"]
+
+
+def _save_validation_results(data_file_path: str, results: dict) -> None:
+    """
+    Save the validation results of an extracted report, keyed by result_key.
+    """
+    with atomic_write(validation_results_path(data_file_path)) as f:
+        json.dump({"results": results}, f, indent=4)
+
+
+def revalidate_report(old_data_file_path: str, new_data_file_path: str, validate_segment) -> dict:
+    """
+    Validate a new export of a report, only running the validation on the segments that changed.
+    Results are stored next to each extracted report, keyed by date, segment id and segment hash,
+    and the results of the segments identical to the previous export are reused. The results are
+    saved after every validated segment, so a failing validation does not lose the ones before it.
+    Args:
+        old_data_file_path (str): Path to the file created by create_retrieval_data for the previous export.
+        new_data_file_path (str): Path to the file created by create_retrieval_data for the new export.
+        validate_segment (callable): Called with the logs date, the segment id and the segment tables,
+            returns the validation result of the segment and whether it may be stored and reused
+            (e.g. not if it was made without regulation knowledge).
+    Returns:
+        dict: The validation result of every segment keyed by logs date and segment id, and the
+            "revalidated" and "reused" lists of (logs date, segment id).
+    """
+    stored_results = _load_validation_results(old_data_file_path)
+    stored_results.update(_load_validation_results(new_data_file_path))
+    new_report = load_retrieval_data(new_data_file_path)
+
+    results = {}
+    segment_results = {}
+    revalidated = []
+    reused = []
+    for logs_date, segments in new_report.items():
+        for segment_id, tables in segments.items():
+            key = result_key(logs_date, segment_id, tables)
+            if key in stored_results:
+                reused.append((logs_date, segment_id))
+                results[key] = stored_results[key]
+                segment_results.setdefault(logs_date, {})[segment_id] = stored_results[key]
+                continue
+
+            result, store = validate_segment(logs_date, segment_id, tables)
+            revalidated.append((logs_date, segment_id))
+            segment_results.setdefault(logs_date, {})[segment_id] = result
+            if store:
+                results[key] = result
+                _save_validation_results(new_data_file_path, results)
+
+    _save_validation_results(new_data_file_path, results)
+
+    return {"results": segment_results, "revalidated": revalidated, "reused": reused}
@@ -1,23 +1,17 @@
 ## this is goind to be a pdf validator agent
 from dotenv import load_dotenv
-import os
-import base64
-import json
+import re
 
-from openai import OpenAI
-
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+from agents.llm_client import chat_completion, stream_chat_completion
 
 # Ensure the .env file is loaded to access environment variables
 load_dotenv()
 
-llm_client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-)
+# Maximum tokens of a segment validation
+VALIDATION_MAX_TOKENS = 1024
+
+# A definitive invalid verdict in the (partial) validation output, e.g. 'valid': false
+INVALID_VERDICT = re.compile(r"""["']valid["']\s*:\s*false""", re.IGNORECASE)
 
 def validate_ccmta_segment(report_chunk: str, eld_tech_knowledge: str, hos_reg_knowledge) -> str:
     """
@@ -31,6 +25,76 @@ def validate_ccmta_segment(report_chunk: str, eld_tech_knowledge: str, hos_reg_k
     Returns:
         str: Validated JSON or error message.
     """
+    messages = _build_validation_messages(report_chunk, eld_tech_knowledge, hos_reg_knowledge)
+    
+    # small segments are routed to a cheaper model without web search
+    response = chat_completion(messages, max_tokens=VALIDATION_MAX_TOKENS, route_input=report_chunk)
+    
+    return response.choices[0].message.content
+
+async def stream_ccmta_segment(report_chunk: str, eld_tech_knowledge: str, hos_reg_knowledge: str, on_finding=None, stop_on_invalid: bool=True) -> str:
+    """
+    Validate the CCMTA report chunk, streaming the model output as it is generated.
+    Every completed line of the output is passed to on_finding as soon as it is received. Once a
+    definitive invalid verdict has been parsed, the generation is stopped at the end of the findings
+    that follow it (the first empty line after them), before the rest of the answer.
+    
+    Args:
+        report_chunk (str): The text content of the CCMTA report chunk.
+        eld_tech_knowledge (str): Knowledge about ELD technology.
+        hos_reg_knowledge (str): Knowledge about HOS regulations.
+        on_finding (callable | None): Coroutine function called with each output line and the number of tokens received so far.
+        stop_on_invalid (bool): Stop the generation at the end of the findings of an invalid verdict.
+        
+    Returns:
+        str: Validated JSON or error message, possibly cut after the findings of the invalid verdict.
+    """
+    messages = _build_validation_messages(report_chunk, eld_tech_knowledge, hos_reg_knowledge, verdict_first=True)
+
+    stream = await stream_chat_completion(messages, max_tokens=VALIDATION_MAX_TOKENS, route_input=report_chunk)
+
+    content = ""
+    pending_line = ""
+    tokens = 0
+    invalid = False
+    findings = 0
+    stopped = False
+    async for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        delta = chunk.choices[0].delta.content
+        tokens += 1
+        content += delta
+        pending_line += delta
+        # forward the complete lines, keep the unfinished one
+        while "\n" in pending_line:
+            line, pending_line = pending_line.split("\n", 1)
+            if line.strip() and on_finding is not None:
+                await on_finding(line, tokens)
+            if not stop_on_invalid:
+                continue
+            if invalid and line.strip():
+                findings += 1
+            elif invalid and findings:
+                # an empty line ends the findings of the invalid verdict
+                stopped = True
+                break
+            elif INVALID_VERDICT.search(line):
+                invalid = True
+        if stopped:
+            # the verdict and its findings are known, no need to wait for the rest of the generation
+            await stream.close()
+            break
+
+    if not stopped and pending_line.strip() and on_finding is not None:
+        await on_finding(pending_line, tokens)
+    return content
+
+def _build_validation_messages(report_chunk: str, eld_tech_knowledge: str, hos_reg_knowledge: str, verdict_first: bool=False) -> list[dict]:
+    """
+    Build the chat messages asking the model to validate a CCMTA report chunk.
+    With verdict_first, the model is asked to give an invalid verdict on the first line, so a stream can be stopped early.
+    """
     messages = [
         {"role": "system", "content": "You are a CCMTA (Canadian Council of Motor Transport Administrators) report validator. You are an expert in validating and structuring CCMTA report data according to federal compliance requirements."},
         {"role": "user", "content": (
@@ -59,14 +123,9 @@ def validate_ccmta_segment(report_chunk: str, eld_tech_knowledge: str, hos_reg_k
             "  }\n"
         )}
     ]
-    
-    response = llm_client.chat.completions.create(
-        model="gpt-4o-mini-search-preview",
-        messages=messages,
-        max_tokens=1024,
-        web_search_options={
-            "search_context_size": "low",
-        },
-    )
-    
-    return response.choices[0].message.content
+    if verdict_first:
+        messages[1]["content"] += (
+            "If the report segment is not valid, start your answer with {'valid': false} on its own line, "
+            "followed by one line per missing or incorrect data, then an empty line.\n"
+        )
+    return messages
@@ -0,0 +1,144 @@
+## cache shared by all the workers of the MCP server
+# Extractions and knowledge retrievals are the costly calls of the server. Their results are kept in
+# a SQLite database that every worker process (and every stdio server of the same machine) reads
+# and writes, so a PDF or a query handled by one worker is not processed again by another one.
+# Leases let a single worker run an extraction while the others wait for its result.
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Default location of the shared cache
+SHARED_CACHE_PATH = os.getenv("HOS_CACHE_DB", "./hos_cache.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+def connect_cache(db_path: str=SHARED_CACHE_PATH) -> sqlite3.Connection:
+    """
+    Open the shared cache, creating its tables if needed.
+    Args:
+        db_path (str): Path to the cache database.
+    Returns:
+        sqlite3.Connection: The connection.
+    """
+    # workers write at the same time, wait for the lock instead of failing
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def cache_get(namespace: str, key: str, db_path: str=SHARED_CACHE_PATH):
+    """
+    Return the cached value of a key, or None if it is not cached.
+    """
+    connection = connect_cache(db_path)
+    try:
+        row = connection.execute("SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+    finally:
+        connection.close()
+    return json.loads(row[0]) if row else None
+
+
+def cache_set(namespace: str, key: str, value, db_path: str=SHARED_CACHE_PATH) -> None:
+    """
+    Cache the value (JSON serializable) of a key, replacing any previous value.
+    """
+    connection = connect_cache(db_path)
+    try:
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time()),
+            )
+    finally:
+        connection.close()
+
+
+def cache_claim(namespace: str, key: str, lease_seconds: float, db_path: str=SHARED_CACHE_PATH) -> bool:
+    """
+    Try to take the lease of a key, so only one worker computes its value.
+    A lease not released after lease_seconds (e.g. its worker died) can be taken by another worker.
+    Returns:
+        bool: True if the lease was taken, False if another worker holds it.
+    """
+    now = time.time()
+    connection = connect_cache(db_path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND expires < ?", (namespace, key, now))
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO leases (namespace, key, expires) VALUES (?, ?, ?)",
+                (namespace, key, now + lease_seconds),
+            )
+            return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+
+def cache_renew(namespace: str, key: str, lease_seconds: float, db_path: str=SHARED_CACHE_PATH) -> bool:
+    """
+    Extend the lease of a key held by this worker to lease_seconds from now.
+    Returns:
+        bool: True if the lease was extended, False if it was lost (expired and released or taken over).
+    """
+    connection = connect_cache(db_path)
+    try:
+        with connection:
+            cursor = connection.execute(
+                "UPDATE leases SET expires = ? WHERE namespace = ? AND key = ?", (time.time() + lease_seconds, namespace, key)
+            )
+            return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+
+@contextmanager
+def keep_lease(namespace: str, key: str, lease_seconds: float, db_path: str=SHARED_CACHE_PATH):
+    """
+    Renew a lease taken with cache_claim every third of lease_seconds while the block runs, so a long
+    computation keeps its lease and only a dead worker loses it. The lease is released on exit.
+    """
+    done = threading.Event()
+
+    def renew():
+        while not done.wait(lease_seconds / 3):
+            cache_renew(namespace, key, lease_seconds, db_path)
+
+    renewer = threading.Thread(target=renew, name=f"lease-{namespace}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        done.set()
+        renewer.join()
+        cache_release(namespace, key, db_path)
+
+
+def cache_release(namespace: str, key: str, db_path: str=SHARED_CACHE_PATH) -> None:
+    """
+    Release the lease of a key.
+    """
+    connection = connect_cache(db_path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM leases WHERE namespace = ? AND key = ?", (namespace, key))
+    finally:
+        connection.close()
@@ -0,0 +1,112 @@
+## per-tool concurrency limits and backpressure of the MCP server
+# Each costly tool has a number of calls that may run at the same time in a server worker, the
+# other calls wait for a free slot. When too many calls are already waiting, new ones are rejected
+# right away with a hint of when to retry, instead of piling up until the clients time out.
+#
+# Settings (environment variables):
+#   HOS_TOOL_CONCURRENCY   JSON object of tool name -> calls running at the same time
+#   HOS_MAX_QUEUE_DEPTH    calls of a tool waiting for a slot before new ones are rejected (default: 16)
+import os
+import json
+import math
+import time
+from functools import partial
+from contextlib import asynccontextmanager
+
+import anyio
+
+# Calls of a tool running at the same time, per worker
+DEFAULT_TOOL_CONCURRENCY = {
+    "extract_pdf_data": 2,
+    "learn_vendor_layout": 1,
+    "validate_report_chunk": 8,
+    "revalidate_report_data": 2,
+    "retrieve_ccmta_eld_knowledge": 8,
+    "retrieve_ccmta_hos_regulations_knowledge": 8,
+    "retrieve_ccmta_knowledge_batch": 4,
+    "diff_report_data": 4,
+    "check_report_consistency": 4,
+    # a single SQLite writer at a time
+    "ingest_fleet_reports": 1,
+    "query_fleet_reports": 8,
+}
+TOOL_CONCURRENCY = {**DEFAULT_TOOL_CONCURRENCY, **json.loads(os.getenv("HOS_TOOL_CONCURRENCY", "{}"))}
+# Limit of the tools not listed above
+FALLBACK_CONCURRENCY = 4
+MAX_QUEUE_DEPTH = int(os.getenv("HOS_MAX_QUEUE_DEPTH", "16"))
+
+# Duration assumed for a call before any call of the tool has completed, in seconds
+INITIAL_CALL_DURATION = 5.0
+
+# Limiters, created on first use
+_tool_limiters = {}
+
+
+class ServerBusyError(RuntimeError):
+    """
+    Raised when a tool call is rejected because too many calls are already waiting.
+    """
+    def __init__(self, tool_name: str, retry_after: int):
+        self.tool_name = tool_name
+        self.retry_after = retry_after
+        super().__init__(f"Server busy: too many {tool_name} calls waiting. Retry after {retry_after} seconds.")
+
+
+class ToolLimiter:
+    """
+    Concurrency limit and wait queue of a tool.
+    """
+    def __init__(self, tool_name: str, concurrency: int, max_queue_depth: int=MAX_QUEUE_DEPTH):
+        self.tool_name = tool_name
+        self.concurrency = concurrency
+        self.max_queue_depth = max_queue_depth
+        self.limiter = anyio.CapacityLimiter(concurrency)
+        self.waiting = 0
+        self.average_duration = INITIAL_CALL_DURATION
+
+    def retry_after(self) -> int:
+        """
+        Estimate in seconds when a slot will be free, from the queued calls and the average call duration.
+        """
+        queued_rounds = (self.waiting + self.concurrency) / self.concurrency
+        return max(1, math.ceil(queued_rounds * self.average_duration))
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Wait for a free slot, or raise ServerBusyError if the wait queue is full.
+        """
+        try:
+            self.limiter.acquire_nowait()
+        except anyio.WouldBlock:
+            if self.waiting >= self.max_queue_depth:
+                raise ServerBusyError(self.tool_name, self.retry_after())
+            self.waiting += 1
+            try:
+                await self.limiter.acquire()
+            finally:
+                self.waiting -= 1
+
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.limiter.release()
+            # moving average, recent calls weigh more
+            self.average_duration = 0.8 * self.average_duration + 0.2 * (time.monotonic() - start_time)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """
+        Run a blocking function in a worker thread once a slot is free, keeping the event loop responsive.
+        """
+        async with self.slot():
+            return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs))
+
+
+def tool_limiter(tool_name: str) -> ToolLimiter:
+    """
+    Return the limiter of a tool, creating it on first use.
+    """
+    if tool_name not in _tool_limiters:
+        _tool_limiters[tool_name] = ToolLimiter(tool_name, TOOL_CONCURRENCY.get(tool_name, FALLBACK_CONCURRENCY))
+    return _tool_limiters[tool_name]
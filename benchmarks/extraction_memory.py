@@ -0,0 +1,72 @@
+# Benchmark for the peak memory of the PDF table extraction
+# Builds reports of increasing size by repeating the pages of a sample report and measures
+# the peak RSS of the in-memory extraction and of the streaming extraction in fresh interpreters.
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EXTRACT_SNIPPET = (
+    "import resource, sys\n"
+    "from agents.pdf_data_handler_v2 import create_retrieval_data\n"
+    "create_retrieval_data(sys.argv[1], stream=sys.argv[2] == 'stream')\n"
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+
+def build_report(sample_pdf_path: str, pages: int, output_path: str) -> str:
+    """
+    Build a report with the given number of pages by repeating the pages of a sample report.
+    Args:
+        sample_pdf_path (str): Path to the sample report.
+        pages (int): Number of pages of the generated report.
+        output_path (str): Path of the generated report.
+    Returns:
+        str: Path of the generated report.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(sample_pdf_path)
+    writer = PdfWriter()
+    for i in range(pages):
+        writer.add_page(reader.pages[i % len(reader.pages)])
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return output_path
+
+
+def measure_extraction(pdf_path: str, mode: str) -> tuple[float, int]:
+    """
+    Run the extraction in a fresh interpreter.
+    Args:
+        pdf_path (str): Path to the report.
+        mode (str): "stream" for the streaming extraction, anything else for the in-memory one.
+    Returns:
+        tuple[float, int]: Elapsed time in seconds and peak RSS in kilobytes.
+    """
+    start_time = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", EXTRACT_SNIPPET, pdf_path, mode],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    peak_rss = int(result.stdout.strip().splitlines()[-1])
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    return time.time() - start_time, peak_rss
+
+
+if __name__ == "__main__":
+    sample_pdf_path = sys.argv[1] if len(sys.argv) > 1 else "US2__6028061125-121602771.pdf"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for pages in (10, 100, 1000):
+            pdf_path = build_report(sample_pdf_path, pages, os.path.join(tmp_dir, f"report_{pages}.pdf"))
+            for mode in ("memory", "stream"):
+                elapsed, peak_rss = measure_extraction(pdf_path, mode)
+                print(f"{pages:5d} pages, {mode:6s}: {elapsed:8.2f} s, peak RSS {peak_rss / 1024:8.1f} MB")
@@ -0,0 +1,97 @@
+# Benchmark of the flat NumPy vector index against Chroma
+# Checks that both stores return the same chunks for the same query embeddings, and compares
+# the query latency (opening the store included, as retrieve_knowledge used to do per call)
+# and the peak RSS of a process answering the queries with each store.
+
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+QUERIES = [
+    "What is the purpose of the Header Segment in the ELD Technical Standard?",
+    "How the Will Pair Sleeper Berth works?",
+    "Login/Logout, Certification of RODS, Data Diagnostics and Malfunctions",
+    "Engine power up and shut down records",
+    "Change in driver's cycle and operating zone",
+]
+
+RSS_SNIPPET = (
+    "import json, resource, sys\n"
+    "backend, vector_db_path, embeddings_file = sys.argv[1:4]\n"
+    "query_embeddings = json.load(open(embeddings_file))\n"
+    "if backend == 'flat':\n"
+    "    from agents.flat_vector_store import flat_index_path, search_flat_index\n"
+    "    search_flat_index(flat_index_path(vector_db_path), query_embeddings, k=2)\n"
+    "else:\n"
+    "    from langchain_chroma import Chroma\n"
+    "    vectordb = Chroma(persist_directory=vector_db_path)\n"
+    "    for embedding in query_embeddings:\n"
+    "        vectordb.similarity_search_by_vector(embedding, k=2)\n"
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+
+def peak_rss(backend: str, vector_db_path: str, embeddings_file: str) -> int:
+    """
+    Answer the queries with one backend in a fresh interpreter and return its peak RSS in kilobytes.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", RSS_SNIPPET, backend, vector_db_path, embeddings_file],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rss = int(result.stdout.strip().splitlines()[-1])
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+if __name__ == "__main__":
+    import json
+    import tempfile
+    from langchain_chroma import Chroma
+    from agents.knowledge_core import get_embeddings, ELD_TECH_STANDARD_DB, HOS_APP_GUIDE_DB
+    from agents import flat_vector_store
+    from agents.flat_vector_store import flat_index_path, search_flat_index
+
+    query_embeddings = get_embeddings().embed_documents(QUERIES)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(query_embeddings, f)
+        embeddings_file = f.name
+
+    for vector_db_path in (ELD_TECH_STANDARD_DB, HOS_APP_GUIDE_DB):
+        print(f"\n{vector_db_path}")
+
+        # Chroma, opened on every query
+        start_time = time.perf_counter()
+        chroma_results = []
+        for embedding in query_embeddings:
+            vectordb = Chroma(persist_directory=vector_db_path)
+            chroma_results.append(vectordb.similarity_search_by_vector(embedding, k=2))
+        chroma_time = (time.perf_counter() - start_time) / len(QUERIES)
+
+        # flat index, cold open then one query at a time
+        flat_vector_store._flat_indexes.clear()
+        start_time = time.perf_counter()
+        flat_results = [search_flat_index(flat_index_path(vector_db_path), [embedding], k=2)[0] for embedding in query_embeddings]
+        flat_time = (time.perf_counter() - start_time) / len(QUERIES)
+
+        # flat index, all the queries in one matrix product
+        start_time = time.perf_counter()
+        search_flat_index(flat_index_path(vector_db_path), query_embeddings, k=2)
+        batch_time = time.perf_counter() - start_time
+
+        matching = sum(
+            [doc.page_content for doc in chroma] == [doc.page_content for doc in flat]
+            for chroma, flat in zip(chroma_results, flat_results)
+        )
+        print(f"Same top-2 results: {matching}/{len(QUERIES)} queries")
+        print(f"Chroma: {chroma_time * 1000:8.2f} ms/query, peak RSS {peak_rss('chroma', vector_db_path, embeddings_file) / 1024:7.1f} MB")
+        print(f"Flat:   {flat_time * 1000:8.2f} ms/query, peak RSS {peak_rss('flat', vector_db_path, embeddings_file) / 1024:7.1f} MB")
+        print(f"Flat batch of {len(QUERIES)} queries: {batch_time * 1000:8.2f} ms")
+
+    os.remove(embeddings_file)
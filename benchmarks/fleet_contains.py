@@ -0,0 +1,86 @@
+# Benchmark of the "contains" filter of the fleet queries
+# Ingests synthetic reports into a fleet database and times the LIKE scan of query_reports for a
+# frequent and a missing text, alone and combined with a segment filter, against a trigram FTS5
+# index over the same rows (build time and database size included).
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.fleet_store import ingest_reports, query_reports
+
+SEGMENT = "changes_in_drivers_duty_status"
+EVENTS = ["On-duty", "Driving", "Off-duty", "Sleeper berth", "Malfunction P", "Login", "Logout", "Power-up", "Shut down"]
+LOCATIONS = ["Calgary, AB", "Red Deer, AB", "Edmonton, AB", "Regina, SK", "Weigh station 6"]
+QUERIES = ["malfunction", "weigh station", "no such text"]
+
+
+def write_report(path: str, driver: str, days: int, rows_per_day: int) -> None:
+    """
+    Write a synthetic extracted report with a header and a duty status segment per day.
+    """
+    report = {}
+    for day in range(days):
+        logs_date = f"2025-{6 + day // 28:02d}-{1 + day % 28:02d}"
+        rows = [["Time", "Event", "Location", "Odometer", "Engine Hours"]]
+        for i in range(rows_per_day):
+            rows.append([f"{i % 24:02d}:{i % 60:02d}", random.choice(EVENTS), random.choice(LOCATIONS), str(1000 + i), str(200 + i)])
+        report[logs_date] = {
+            "header": [[["Date of RODS", "Driver ID"], [logs_date, driver]]],
+            SEGMENT: [rows],
+        }
+    with open(path, "w") as f:
+        json.dump(report, f)
+
+
+def timed(fn, repeat: int=5) -> float:
+    """
+    Return the best time of a call in milliseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start_time)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    reports = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(reports):
+            write_report(os.path.join(tmp_dir, f"driver{i}_tables.json"), f"D{i:04d}", days=14, rows_per_day=100)
+        db_path = os.path.join(tmp_dir, "fleet.db")
+        start_time = time.perf_counter()
+        counts = ingest_reports([tmp_dir], db_path=db_path)
+        print(f"Ingested {counts['rows']} rows of {counts['ingested']} reports in {time.perf_counter() - start_time:.1f} s, "
+              f"{os.path.getsize(db_path) / 1e6:.0f} MB")
+
+        print("\nLIKE scan (query_reports)")
+        for text in QUERIES:
+            alone = timed(lambda: query_reports(db_path=db_path, contains=text, group_by=["driver"]))
+            first_rows = timed(lambda: query_reports(db_path=db_path, contains=text))
+            with_segment = timed(lambda: query_reports(db_path=db_path, contains=text, segment=SEGMENT, driver="D0001"))
+            print(f"  {text!r}: count per driver {alone:.1f} ms, first 100 rows {first_rows:.1f} ms, "
+                  f"one driver {with_segment:.1f} ms")
+
+        connection = sqlite3.connect(db_path)
+        start_time = time.perf_counter()
+        connection.execute("CREATE VIRTUAL TABLE rows_fts USING fts5(row_text, content='report_rows', tokenize='trigram')")
+        connection.execute("INSERT INTO rows_fts (rows_fts) VALUES ('rebuild')")
+        connection.commit()
+        print(f"\nTrigram FTS5 index built in {time.perf_counter() - start_time:.1f} s, "
+              f"database now {os.path.getsize(db_path) / 1e6:.0f} MB")
+        for text in QUERIES:
+            query = '"' + text + '"'
+            count = timed(lambda: connection.execute("SELECT COUNT(*) FROM rows_fts WHERE rows_fts MATCH ?", (query,)).fetchone())
+            first_rows = timed(lambda: connection.execute("SELECT rowid FROM rows_fts WHERE rows_fts MATCH ? LIMIT 100", (query,)).fetchall())
+            print(f"  {text!r}: count {count:.1f} ms, first 100 rows {first_rows:.1f} ms")
+        connection.close()
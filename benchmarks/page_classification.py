@@ -0,0 +1,37 @@
+# Benchmark for the page pre-classification of the PDF table extraction
+# Runs the extraction with full table detection on every page and with the pypdf
+# pre-classification, and reports the time spent and saved per page type.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.pdf_data_handler_v2 import extract_tables_from_pdf, print_page_stats
+
+
+if __name__ == "__main__":
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "US2__6028061125-121602771.pdf"
+
+    baseline = {}
+    start_time = time.time()
+    full_tables = extract_tables_from_pdf(pdf_path, classify=False, stats=baseline)
+    full_time = time.time() - start_time
+
+    stats = {}
+    start_time = time.time()
+    classified_tables = extract_tables_from_pdf(pdf_path, classify=True, stats=stats)
+    classified_time = time.time() - start_time
+
+    print(f"\nFull table detection: {full_time:.3f} s")
+    print_page_stats(baseline)
+    print(f"\nPre-classified: {classified_time:.3f} s")
+    print_page_stats(stats, baseline=baseline)
+
+    same_segments = {
+        date: sorted(tables) for date, tables in full_tables.items()
+    } == {
+        date: sorted(tables) for date, tables in classified_tables.items()
+    }
+    print(f"\nSame dates and segments extracted: {same_segments}")
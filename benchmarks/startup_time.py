@@ -0,0 +1,96 @@
+# Benchmark for the MCP server startup time
+# MCP clients start the server on demand, so everything imported by hos_report_test
+# is paid on the first user interaction. This script measures the import time in fresh
+# interpreters and checks that heavy dependencies are only loaded by the tools that need them.
+
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that must not be imported until a tool actually needs them
+HEAVY_MODULES = [
+    "pdfplumber",
+    "pdfminer",
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_chroma",
+    "langchain_community",
+    "chromadb",
+    "openai",
+]
+
+IMPORT_SNIPPET = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import hos_report_test\n"
+    "elapsed = time.perf_counter() - start\n"
+    "loaded = [m for m in {heavy!r} if m in sys.modules]\n"
+    "print(elapsed)\n"
+    "print(','.join(loaded))\n"
+)
+
+def measure_import_time(runs: int=5) -> tuple[list[float], list[str]]:
+    """
+    Import the server module in fresh interpreters and measure the import time.
+    Args:
+        runs (int): Number of fresh interpreters to start.
+    Returns:
+        tuple[list[float], list[str]]: Import time of each run in seconds and the heavy modules that were loaded.
+    """
+    timings = []
+    loaded = []
+    snippet = IMPORT_SNIPPET.format(heavy=HEAVY_MODULES)
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", snippet],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        lines = result.stdout.splitlines()
+        timings.append(float(lines[0]))
+        loaded = [m for m in lines[1].split(",") if m] if len(lines) > 1 else []
+    return timings, loaded
+
+
+def slowest_imports(top: int=10) -> list[tuple[int, str]]:
+    """
+    Run the import with -X importtime and return the slowest modules.
+    Args:
+        top (int): Number of modules to return.
+    Returns:
+        list[tuple[int, str]]: Cumulative import time in microseconds and module name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import hos_report_test"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), module.strip()))
+    entries.sort(reverse=True)
+    return entries[:top]
+
+
+if __name__ == "__main__":
+    timings, loaded = measure_import_time()
+    print(f"Server import time over {len(timings)} runs: "
+          f"min {min(timings):.3f}s, max {max(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s")
+    if loaded:
+        print(f"Heavy modules loaded at import time: {', '.join(loaded)}")
+    else:
+        print("No heavy modules loaded at import time.")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative, module in slowest_imports():
+        print(f"{cumulative / 1000:10.1f} ms  {module}")
@@ -0,0 +1,45 @@
+# Benchmark for the pypdf fast path of the text segments
+# Runs the extraction with pdfplumber on every segment page and with the text segment pages
+# parsed from the pypdf layout text, and reports the time spent per page type and whether
+# both extractions give the same tables.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.pdf_data_handler_v2 import extract_tables_from_pdf, print_page_stats
+
+
+if __name__ == "__main__":
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "US2__6028061125-121602771.pdf"
+
+    baseline = {}
+    start_time = time.time()
+    plumber_tables = extract_tables_from_pdf(pdf_path, fast_text=False, stats=baseline)
+    plumber_time = time.time() - start_time
+
+    stats = {}
+    start_time = time.time()
+    fast_tables = extract_tables_from_pdf(pdf_path, fast_text=True, stats=stats)
+    fast_time = time.time() - start_time
+
+    print(f"\npdfplumber on every segment page: {plumber_time:.3f} s")
+    print_page_stats(baseline)
+    print(f"\npypdf fast path on text segment pages: {fast_time:.3f} s")
+    print_page_stats(stats)
+    if "text_segment" in stats:
+        pages = stats["text_segment"]["pages"]
+        print(f"{pages} text segment pages, {1000 * stats['text_segment']['seconds'] / pages:.1f} ms per page")
+    print(f"Speedup: {plumber_time / fast_time:.2f}x")
+
+    different = [
+        (logs_date, table_title)
+        for logs_date in plumber_tables.keys() | fast_tables.keys()
+        for table_title in plumber_tables.get(logs_date, {}).keys() | fast_tables.get(logs_date, {}).keys()
+        if plumber_tables.get(logs_date, {}).get(table_title) != fast_tables.get(logs_date, {}).get(table_title)
+    ]
+    print(f"\nSame tables extracted: {not different}")
+    for logs_date, table_title in sorted(different):
+        print(f"  differs: {logs_date} / {table_title}")
@@ -5,17 +5,27 @@
 import os
 from typing import Any
 import json
+import time
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 from mcp.types import ToolAnnotations
 
-from agents.pdf_data_handler_v2 import create_retrieval_data, retrieve_table_data
-from agents.report_validator import validate_ccmta_segment
-from agents.knowledge_core import retrieve_knowledge
+from agents.pdf_data_handler_v2 import create_retrieval_data, retrieve_table_data, file_content_hash
+from agents.report_validator import validate_ccmta_segment, stream_ccmta_segment, VALIDATION_MAX_TOKENS, INVALID_VERDICT
+from agents.knowledge_core import retrieve_knowledge, retrieve_knowledge_batch, lookup_segment_knowledge, ELD_TECH_STANDARD_DB, HOS_APP_GUIDE_DB, VECTOR_STORE_BACKEND
+from agents.layout_templates import load_layout_templates, learn_layout_template
+from agents.report_diff import diff_reports, revalidate_report
+from agents.fleet_store import ingest_reports, query_reports
+from agents.shared_cache import cache_get, cache_set, cache_claim, keep_lease
+from agents.tool_limits import tool_limiter
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Time after which the extraction of a worker that stopped renewing its lease (e.g. it died) is
+# taken over by another worker, in seconds. A running extraction renews it every third of this time.
+EXTRACTION_LEASE_SECONDS = 60
+
 # Create an MCP server
 mcp = FastMCP(
     name="hos_report_test",
@@ -26,6 +36,66 @@ mcp = FastMCP(
 # Tools and Resources
 #----------------------------------------------------
 
+def _extract_pdf_shared(pdf_file_path: str, stream: bool) -> str:
+    """Extract a PDF once for all the server workers, reusing the output of a previous extraction if the PDF did not change."""
+    key = json.dumps([os.path.abspath(pdf_file_path), file_content_hash(pdf_file_path), stream])
+    while True:
+        cached = cache_get("extraction", key)
+        if cached and os.path.exists(cached["output_file"]) and os.path.getmtime(cached["output_file"]) == cached["mtime"]:
+            return cached["output_file"]
+
+        if cache_claim("extraction", key, EXTRACTION_LEASE_SECONDS):
+            with keep_lease("extraction", key, EXTRACTION_LEASE_SECONDS):
+                # known vendor layouts let the extraction skip the full table detection
+                output_file = os.path.abspath(create_retrieval_data(pdf_file_path, stream=stream, templates=load_layout_templates()))
+                cache_set("extraction", key, {"output_file": output_file, "mtime": os.path.getmtime(output_file)})
+                return output_file
+
+        # another worker is extracting this PDF, wait for its result
+        time.sleep(0.5)
+
+
+def _vector_db_version(vector_db_path: str) -> float:
+    """Return the last modification time of the files of a vector database, which changes when it is rebuilt."""
+    return max(
+        (os.path.getmtime(os.path.join(root, name)) for root, _, names in os.walk(vector_db_path) for name in names),
+        default=0.0,
+    )
+
+
+def _cached_knowledge(vector_db_paths: list[str], key: list, retrieve):
+    """
+    Return the knowledge of a query from the shared cache, retrieving and caching it on a miss.
+    The cache key includes the vector store backend and the version of the vector databases searched,
+    so rebuilt databases or a backend switch are not answered from stale entries.
+    """
+    versions = {path: _vector_db_version(path) for path in vector_db_paths}
+    cache_key = json.dumps([VECTOR_STORE_BACKEND, versions, *key])
+    knowledge = cache_get("knowledge", cache_key)
+    if knowledge is None:
+        knowledge = retrieve()
+        if knowledge:
+            cache_set("knowledge", cache_key, knowledge)
+    return knowledge
+
+
+def _retrieve_knowledge_text(vector_db_path: str, query: str) -> str:
+    """Retrieve the passages of a query from a vector database, as text."""
+    knowledge = retrieve_knowledge(vector_db_path=vector_db_path, query=query)
+    return "\n".join(chunk.page_content for chunk in knowledge)
+
+
+def _retrieve_knowledge_batch_text(queries: list[str], chunks: int) -> dict:
+    """Retrieve the passages of many queries from both knowledge corpora, as text."""
+    knowledge = retrieve_knowledge_batch([ELD_TECH_STANDARD_DB, HOS_APP_GUIDE_DB], queries, chunks=chunks)
+    if not any(knowledge.values()):
+        return {}
+    return {
+        "eld": "\n".join(chunk.page_content for chunk in knowledge[ELD_TECH_STANDARD_DB]),
+        "hos": "\n".join(chunk.page_content for chunk in knowledge[HOS_APP_GUIDE_DB]),
+    }
+
+
 # extract data from a PDF file and create a json file for fast retrieval
 # save the file locally and return the path to the file
 @mcp.tool(
@@ -37,6 +107,7 @@ mcp = FastMCP(
         description="This tool extracts data from a PDF file and creates a JSON file for future fast retrieval. It saves the file locally and returns the path to the file.",
         parameters={
             "pdf_file_path": {"type": "string", "description": "Path to the PDF file"},
+            "stream": {"type": "boolean", "description": "Write tables to a JSON Lines file page by page, keeping memory flat for very large reports"},
         },
         responses={
             200: {"description": "PDF data extracted and vector database created successfully"},
@@ -52,14 +123,15 @@ mcp = FastMCP(
         ]
     )
 )
-def extract_pdf_data(pdf_file_path: str) -> str:
+async def extract_pdf_data(pdf_file_path: str, stream: bool = False) -> str:
     """Extract data from a PDF file and create a JSON file for future fast retrieval."""
     # verify the PDF file path
     if not pdf_file_path or not isinstance(pdf_file_path, str) or not pdf_file_path.endswith('.pdf'):
         raise ValueError("Invalid PDF file path. Please provide a valid path.")
     
     # Create the vector database from the PDF file
-    output_file = create_retrieval_data(pdf_file_path)
+    # run in a worker thread so concurrent requests for the same PDF can share one extraction
+    output_file = await tool_limiter("extract_pdf_data").run_sync(_extract_pdf_shared, pdf_file_path, stream)
     if not output_file:
         raise RuntimeError("Failed to create vector database from the PDF file.")
     
@@ -68,6 +140,36 @@ def extract_pdf_data(pdf_file_path: str) -> str:
     return f"PDF data extracted successfully. Json file created at: {full_path}"
 
 
+# learn the table layout of an ELD vendor report so later reports of the same vendor are extracted faster
+@mcp.tool(
+    name="learn_vendor_layout",
+    description="Learn and store the table layout template of an ELD vendor report, used to speed up the extraction of later reports with the same layout.",
+    annotations=ToolAnnotations(
+        title="Learn Vendor Layout",
+        readOnlyHint=False,
+        description="This tool runs full table detection on a report and stores the column boundaries and bounding boxes of each segment table, keyed by a fingerprint of the report layout.",
+        parameters={
+            "pdf_file_path": {"type": "string", "description": "Path to a PDF report of the vendor"},
+            "vendor": {"type": "string", "description": "Name of the ELD vendor"}
+        },
+        responses={
+            200: {"description": "Layout template stored successfully"},
+            400: {"description": "Invalid PDF file path"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def learn_vendor_layout(pdf_file_path: str, vendor: str) -> str:
+    """Learn and store the table layout template of an ELD vendor report."""
+    if not pdf_file_path or not isinstance(pdf_file_path, str) or not pdf_file_path.endswith('.pdf'):
+        raise ValueError("Invalid PDF file path. Please provide a valid path.")
+    if not vendor or not isinstance(vendor, str):
+        raise ValueError("Invalid vendor. Please provide the name of the ELD vendor.")
+
+    fingerprint = await tool_limiter("learn_vendor_layout").run_sync(learn_layout_template, pdf_file_path, vendor)
+    return f"Layout template for {vendor} stored with fingerprint: {fingerprint}"
+
+
 
 
 # Tool for retrieving header table data from the JSON file created by extract_pdf_data
@@ -79,7 +181,7 @@ def extract_pdf_data(pdf_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves header table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Header table data retrieved successfully"},
@@ -91,7 +193,7 @@ def extract_pdf_data(pdf_file_path: str) -> str:
 def get_header_table_data(json_file_path: str) -> str:
     """Retrieve header table data from a JSON file created by the extract_pdf_data tool."""
     # Verify the JSON file path
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
     
     # Retrieve the header table data from the JSON file
@@ -111,7 +213,7 @@ def get_header_table_data(json_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves the 'Changes in driver's Duty Status, Intermediate Logs and Special Driving Conditions (Personal Use and Yard Moves)' table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Table data retrieved successfully"},
@@ -122,7 +224,7 @@ def get_header_table_data(json_file_path: str) -> str:
 )
 def get_duty_status_table_data(json_file_path: str) -> str:
     """Retrieve the 'Changes in driver's Duty Status, Intermediate Logs and Special Driving Conditions (Personal Use and Yard Moves)' table data from a JSON file."""
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
 
     table_data = retrieve_table_data(
@@ -143,7 +245,7 @@ def get_duty_status_table_data(json_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves the 'Login/Logout, Certification of RODS, Data Diagnostics and Malfunctions' table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Table data retrieved successfully"},
@@ -154,7 +256,7 @@ def get_duty_status_table_data(json_file_path: str) -> str:
 )
 def get_loginlogout_table_data(json_file_path: str) -> str:
     """Retrieve the 'Login/Logout, Certification of RODS, Data Diagnostics and Malfunctions' table data from a JSON file."""
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
 
     table_data = retrieve_table_data(
@@ -180,7 +282,7 @@ def get_loginlogout_table_data(json_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves the 'Change in Driver's Cycle, Change in Operating Zone, Off-duty Time Deferral' table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Table data retrieved successfully"},
@@ -191,7 +293,7 @@ def get_loginlogout_table_data(json_file_path: str) -> str:
 )
 def get_cycle_change_table_data(json_file_path: str) -> str:
     """Retrieve the 'Change in Driver's Cycle, Change in Operating Zone, Off-duty Time Deferral' table data from a JSON file."""
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
 
     table_data = retrieve_table_data(
@@ -214,7 +316,7 @@ def get_cycle_change_table_data(json_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves the 'Comments, Remarks and Annotations' table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Table data retrieved successfully"},
@@ -225,7 +327,7 @@ def get_cycle_change_table_data(json_file_path: str) -> str:
 )
 def get_comments_table_data(json_file_path: str) -> str:
     """Retrieve the 'Comments, Remarks and Annotations' table data from a JSON file."""
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
 
     table_data = retrieve_table_data(
@@ -249,7 +351,7 @@ def get_comments_table_data(json_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves the 'Additional Hours Not Recorded' table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Table data retrieved successfully"},
@@ -260,7 +362,7 @@ def get_comments_table_data(json_file_path: str) -> str:
 )
 def get_additional_hours_table_data(json_file_path: str) -> str:
     """Retrieve the 'Additional Hours Not Recorded' table data from a JSON file."""
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
 
     table_data = retrieve_table_data(
@@ -284,7 +386,7 @@ def get_additional_hours_table_data(json_file_path: str) -> str:
         readOnlyHint=True,
         description="This tool retrieves the 'Engine Power Up and Shut Down' table data from a JSON file created by the extract_pdf_data tool.",
         parameters={
-            "json_file_path": {"type": "string", "description": "Path to the JSON file created by extract_pdf_data"}
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
         },
         responses={
             200: {"description": "Table data retrieved successfully"},
@@ -295,7 +397,7 @@ def get_additional_hours_table_data(json_file_path: str) -> str:
 )
 def get_engine_table_data(json_file_path: str) -> str:
     """Retrieve the 'Engine Power Up and Shut Down' table data from a JSON file."""
-    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith('.json'):
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
         raise ValueError("Invalid JSON file path. Please provide a valid path.")
 
     table_data = retrieve_table_data(
@@ -321,7 +423,9 @@ def get_engine_table_data(json_file_path: str) -> str:
         parameters={
             "report_chunk": {"type": "string", "description": "CCMTA report segment to validate"},
             "eld_tech_knowledge": {"type": "string", "description": "Knowledge about ELD technical standards"},
-            "hos_reg_knowledge": {"type": "string", "description": "Knowledge about HoS regulations"}
+            "hos_reg_knowledge": {"type": "string", "description": "Knowledge about HoS regulations"},
+            "stream": {"type": "boolean", "description": "Stream the findings through progress and log notifications as they are generated"},
+            "stop_on_invalid": {"type": "boolean", "description": "When streaming, stop the generation once an invalid verdict and its findings are given"}
         },
         responses={
             200: {"description": "CCMTA report validated successfully"},
@@ -330,13 +434,35 @@ def get_engine_table_data(json_file_path: str) -> str:
         }
     )
 )
-def validate_report_chunk(report_chunk: str, eld_tech_knowledge: str, hos_reg_knowledge) -> str:
+async def validate_report_chunk(report_chunk: str, eld_tech_knowledge: str, hos_reg_knowledge, stream: bool = False, stop_on_invalid: bool = True, ctx: Context = None) -> str:
     """Validate a CCMTA report against the schema"""    
-    # Validate the CCMTA report
-    validation_result = validate_ccmta_segment(report_chunk, eld_tech_knowledge, hos_reg_knowledge)
+    if not stream:
+        # Validate the CCMTA report
+        validation_result = await tool_limiter("validate_report_chunk").run_sync(
+            validate_ccmta_segment, report_chunk, eld_tech_knowledge, hos_reg_knowledge
+        )
+        if not validation_result:
+            raise RuntimeError("CCMTA report validation failed.")
+        
+        return f"CCMTA report validated successfully: {validation_result}"
+
+    # forward each finding to the client as soon as the model writes it
+    async def on_finding(finding: str, tokens: int) -> None:
+        if ctx is None:
+            return
+        await ctx.report_progress(tokens, VALIDATION_MAX_TOKENS, finding)
+        await ctx.info(finding)
+
+    async with tool_limiter("validate_report_chunk").slot():
+        validation_result = await stream_ccmta_segment(
+            report_chunk, eld_tech_knowledge, hos_reg_knowledge,
+            on_finding=on_finding, stop_on_invalid=stop_on_invalid
+        )
     if not validation_result:
         raise RuntimeError("CCMTA report validation failed.")
-    
+
+    if stop_on_invalid and INVALID_VERDICT.search(validation_result):
+        return f"CCMTA report validation stopped at an invalid verdict: {validation_result}"
     return f"CCMTA report validated successfully: {validation_result}"
 
 
@@ -357,17 +483,18 @@ def validate_report_chunk(report_chunk: str, eld_tech_knowledge: str, hos_reg_kn
         }
     )
 )
-def retrieve_ccmta_eld_knowledge(query: str) -> str:
+async def retrieve_ccmta_eld_knowledge(query: str) -> str:
     """Retrieve knowledge about CCMTA ELD (Electronic Logging Device) requirements and technical standards."""
     if not query or not isinstance(query, str):
         raise ValueError("Invalid query. Please provide a valid query string.")
     
     # Retrieve knowledge from the knowledge core
-    knowledge = retrieve_knowledge(vector_db_path="./agents/eld_tech_standard_db" , query=query)
-    if not knowledge:
+    knowledge_str = await tool_limiter("retrieve_ccmta_eld_knowledge").run_sync(
+        _cached_knowledge, [ELD_TECH_STANDARD_DB], [query], lambda: _retrieve_knowledge_text(ELD_TECH_STANDARD_DB, query)
+    )
+    if not knowledge_str:
         raise RuntimeError("Failed to retrieve CCMTA ELD knowledge.")
     
-    knowledge_str = "\n".join(chunk.page_content for chunk in knowledge)
     return f"CCMTA ELD Knowledge: {knowledge_str}"
 
 
@@ -388,17 +515,294 @@ def retrieve_ccmta_eld_knowledge(query: str) -> str:
         }
     )
 )
-def retrieve_ccmta_hos_regulations_knowledge(query: str) -> str:
+async def retrieve_ccmta_hos_regulations_knowledge(query: str) -> str:
     """Retrieve knowledge about the application guide of CCMTA HoS (Hours of Service) regulations."""
     if not query or not isinstance(query, str):
         raise ValueError("Invalid query. Please provide a valid query string.")
     
     # Retrieve knowledge from the knowledge core
-    knowledge = retrieve_knowledge(vector_db_path="./agents/hos_app_guide_db", query=query)
-    if not knowledge:
+    knowledge_str = await tool_limiter("retrieve_ccmta_hos_regulations_knowledge").run_sync(
+        _cached_knowledge, [HOS_APP_GUIDE_DB], [query], lambda: _retrieve_knowledge_text(HOS_APP_GUIDE_DB, query)
+    )
+    if not knowledge_str:
         raise RuntimeError("Failed to retrieve CCMTA HoS regulations knowledge.")
     
-    knowledge_str = "\n".join(chunk.page_content for chunk in knowledge)
     return f"CCMTA HoS Regulations Knowledge: {knowledge_str}"
 
 
+@mcp.tool(
+    name="retrieve_ccmta_knowledge_batch",
+    description="Retrieve knowledge about CCMTA ELD technical standards and HoS regulations for many queries at once, with repeated passages removed.",
+    annotations=ToolAnnotations(
+        title="Retrieve CCMTA Knowledge (Batch)",
+        readOnlyHint=True,
+        description="This tool embeds all the queries in a single request, searches the CCMTA ELD technical standard and the HoS application guide once per query, and returns the passages without repeated pages or overlapping text.",
+        parameters={
+            "queries": {"type": "array", "items": {"type": "string"}, "description": "Queries to search for in both knowledge corpora"},
+            "chunks": {"type": "integer", "description": "Number of passages to retrieve per query and corpus"}
+        },
+        responses={
+            200: {"description": "Knowledge retrieved successfully"},
+            404: {"description": "Knowledge not found"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def retrieve_ccmta_knowledge_batch(queries: list[str], chunks: int = 2) -> str:
+    """Retrieve knowledge about CCMTA ELD technical standards and HoS regulations for many queries at once."""
+    if not queries or not isinstance(queries, list) or not all(isinstance(q, str) and q for q in queries):
+        raise ValueError("Invalid queries. Please provide a list of valid query strings.")
+
+    knowledge = await tool_limiter("retrieve_ccmta_knowledge_batch").run_sync(
+        _cached_knowledge, [ELD_TECH_STANDARD_DB, HOS_APP_GUIDE_DB], ["batch", queries, chunks], lambda: _retrieve_knowledge_batch_text(queries, chunks)
+    )
+    if not knowledge:
+        raise RuntimeError("Failed to retrieve CCMTA knowledge.")
+
+    return f"CCMTA ELD Knowledge: {knowledge['eld']}\n\nCCMTA HoS Regulations Knowledge: {knowledge['hos']}"
+
+
+@mcp.tool(
+    name="get_segment_regulation_knowledge",
+    description="Get the CCMTA ELD technical standard and HoS application guide sections that apply to a report segment, from a precomputed index.",
+    annotations=ToolAnnotations(
+        title="Get Segment Regulation Knowledge",
+        readOnlyHint=True,
+        description="This tool returns the numbered sections of the CCMTA ELD technical standard and the HoS application guide that apply to a report segment. It is a direct lookup in a precomputed index, with no embedding request or similarity search.",
+        parameters={
+            "segment_id": {"type": "string", "description": "Segment id: header, changes_in_drivers_duty_status_intermediate_logs_and_special_driving_conditions, loginlogout_certification_of_rods_data_diagnostics_and_malfunctions, change_in_drivers_cycle_change_in_operating_zone_offduty_time_deferral, comments_remarks_and_annotations, additional_hours_not_recorded or engine_power_up_and_shut_down"}
+        },
+        responses={
+            200: {"description": "Knowledge retrieved successfully"},
+            404: {"description": "Segment not found"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+def get_segment_regulation_knowledge(segment_id: str) -> str:
+    """Get the CCMTA ELD technical standard and HoS application guide sections that apply to a report segment."""
+    if not segment_id or not isinstance(segment_id, str):
+        raise ValueError("Invalid segment id. Please provide a valid segment id.")
+
+    knowledge = lookup_segment_knowledge(segment_id)
+    return (
+        f"CCMTA ELD Knowledge: {knowledge.get('eld_tech_standard', '')}\n\n"
+        f"CCMTA HoS Regulations Knowledge: {knowledge.get('hos_app_guide', '')}"
+    )
+
+
+@mcp.tool(
+    name="diff_report_data",
+    description="Compare two extractions of a re-submitted report and list the rows added, removed or changed per date and segment.",
+    annotations=ToolAnnotations(
+        title="Diff Report Data",
+        readOnlyHint=True,
+        description="This tool compares two JSON files created by the extract_pdf_data tool for two exports of the same report, per date and per segment using row hashes, and returns exactly which rows were added, removed or changed.",
+        parameters={
+            "old_json_file_path": {"type": "string", "description": "Path to the JSON file of the previous export"},
+            "new_json_file_path": {"type": "string", "description": "Path to the JSON file of the new export"}
+        },
+        responses={
+            200: {"description": "Reports compared successfully"},
+            400: {"description": "Invalid JSON file path"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def diff_report_data(old_json_file_path: str, new_json_file_path: str) -> str:
+    """Compare two extractions of a re-submitted report."""
+    for json_file_path in (old_json_file_path, new_json_file_path):
+        if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
+            raise ValueError("Invalid JSON file path. Please provide a valid path.")
+
+    diff = await tool_limiter("diff_report_data").run_sync(diff_reports, old_json_file_path, new_json_file_path)
+    return json.dumps(diff, indent=4)
+
+
+def _validate_report_segment(logs_date: str, segment_id: str, tables: list) -> tuple[str, bool]:
+    """
+    Validate a report segment with the regulation sections indexed for it.
+    A missing index raises FileNotFoundError. Segments the index does not know are validated without
+    regulation knowledge, and their result is not stored for later revalidations.
+    """
+    try:
+        knowledge = lookup_segment_knowledge(segment_id)
+    except KeyError:
+        knowledge = {}
+    report_chunk = json.dumps({"date": logs_date, "segment": segment_id, "tables": tables})
+    result = validate_ccmta_segment(report_chunk, knowledge.get("eld_tech_standard", ""), knowledge.get("hos_app_guide", ""))
+    return result, bool(knowledge)
+
+
+def _revalidate_report_with_diff(old_json_file_path: str, new_json_file_path: str) -> dict:
+    """Revalidate the changed segments of a re-submitted report and summarize its diff."""
+    result = revalidate_report(old_json_file_path, new_json_file_path, _validate_report_segment)
+    result["diff_summary"] = diff_reports(old_json_file_path, new_json_file_path)["summary"]
+    return result
+
+
+@mcp.tool(
+    name="revalidate_report_data",
+    description="Validate a re-submitted report, only running the validation on the segments that changed since the previous export.",
+    annotations=ToolAnnotations(
+        title="Revalidate Report Data",
+        readOnlyHint=False,
+        description="This tool validates every segment of a new export of a report. Segments identical to the previous export reuse its stored validation results, only the changed ones are validated again. Results are stored next to the JSON file for later revalidations.",
+        parameters={
+            "old_json_file_path": {"type": "string", "description": "Path to the JSON file of the previous export"},
+            "new_json_file_path": {"type": "string", "description": "Path to the JSON file of the new export"}
+        },
+        responses={
+            200: {"description": "Report validated successfully"},
+            400: {"description": "Invalid JSON file path"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def revalidate_report_data(old_json_file_path: str, new_json_file_path: str) -> str:
+    """Validate a re-submitted report, only running the validation on the segments that changed."""
+    for json_file_path in (old_json_file_path, new_json_file_path):
+        if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
+            raise ValueError("Invalid JSON file path. Please provide a valid path.")
+
+    result = await tool_limiter("revalidate_report_data").run_sync(
+        _revalidate_report_with_diff, old_json_file_path, new_json_file_path
+    )
+    return json.dumps(result, indent=4)
+
+
+@mcp.tool(
+    name="check_report_consistency",
+    description="Run cross-segment consistency checks over all the dates of an extracted report: odometer and engine hours monotonicity, login/logout pairing and certification of every date.",
+    annotations=ToolAnnotations(
+        title="Check Report Consistency",
+        readOnlyHint=True,
+        description="This tool loads all the segments of a JSON file created by the extract_pdf_data tool into columnar arrays and checks, across all the dates, that odometer and engine hours never decrease between engine power-up/shut-down and duty status events, that every login has a matching logout, and that every date is certified. It runs locally, without any LLM call.",
+        parameters={
+            "json_file_path": {"type": "string", "description": "Path to the JSON (or JSON Lines) file created by extract_pdf_data"}
+        },
+        responses={
+            200: {"description": "Report checked successfully"},
+            400: {"description": "Invalid JSON file path"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def check_report_consistency(json_file_path: str) -> str:
+    """Run cross-segment consistency checks over all the dates of an extracted report."""
+    if not json_file_path or not isinstance(json_file_path, str) or not json_file_path.endswith(('.json', '.jsonl')):
+        raise ValueError("Invalid JSON file path. Please provide a valid path.")
+
+    # numpy is only needed by this tool, keep it out of the server startup
+    from agents.report_analysis import analyze_report
+
+    analysis = await tool_limiter("check_report_consistency").run_sync(analyze_report, json_file_path)
+    return json.dumps(analysis, indent=4)
+
+
+@mcp.tool(
+    name="ingest_fleet_reports",
+    description="Ingest extracted reports into the fleet database, so they can be queried together with query_fleet_reports.",
+    annotations=ToolAnnotations(
+        title="Ingest Fleet Reports",
+        readOnlyHint=False,
+        description="This tool loads JSON files created by the extract_pdf_data tool (or all the extracted reports found in the given directories) into a single indexed SQLite database, keyed by report, driver, date and segment. Reports already ingested and unchanged since are skipped, modified ones are replaced.",
+        parameters={
+            "paths": {"type": "array", "items": {"type": "string"}, "description": "JSON (or JSON Lines) files created by extract_pdf_data, or directories containing them"}
+        },
+        responses={
+            200: {"description": "Reports ingested successfully"},
+            400: {"description": "Invalid paths"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def ingest_fleet_reports(paths: list[str]) -> str:
+    """Ingest extracted reports into the fleet database."""
+    if not paths or not all(isinstance(path, str) and (os.path.isdir(path) or path.endswith(('.json', '.jsonl'))) for path in paths):
+        raise ValueError("Invalid paths. Please provide JSON files or directories containing them.")
+
+    counts = await tool_limiter("ingest_fleet_reports").run_sync(ingest_reports, paths)
+    return json.dumps(counts, indent=4)
+
+
+@mcp.tool(
+    name="query_fleet_reports",
+    description="Query the rows of all the ingested reports by segment, driver, date range or text, or count them per report, driver, date or segment.",
+    annotations=ToolAnnotations(
+        title="Query Fleet Reports",
+        readOnlyHint=True,
+        description="This tool answers fleet level questions from the reports ingested with ingest_fleet_reports, e.g. all the unidentified driver events of a week or every malfunction code across drivers. Without group_by it returns the matching rows with their report, driver, date and segment; with group_by it returns the number of matching rows per group.",
+        parameters={
+            "segment": {"type": "string", "description": "Only rows of this segment id, e.g. 'loginlogout_certification_of_rods_data_diagnostics_and_malfunctions'"},
+            "driver": {"type": "string", "description": "Only rows of this driver"},
+            "date_from": {"type": "string", "description": "Only rows logged on or after this date (YYYY-MM-DD)"},
+            "date_to": {"type": "string", "description": "Only rows logged on or before this date (YYYY-MM-DD)"},
+            "unidentified": {"type": "boolean", "description": "Only rows of the unidentified driver records"},
+            "contains": {"type": "string", "description": "Only rows containing this text (case insensitive), e.g. 'malfunction'"},
+            "group_by": {"type": "array", "items": {"type": "string"}, "description": "Count the matching rows per 'report', 'driver', 'date' and/or 'segment' instead of returning them"},
+            "limit": {"type": "integer", "description": "Maximum number of rows or groups returned (default: 100)"}
+        },
+        responses={
+            200: {"description": "Reports queried successfully"},
+            400: {"description": "Invalid query"},
+            500: {"description": "Internal server error"}
+        }
+    )
+)
+async def query_fleet_reports(
+    segment: str = None,
+    driver: str = None,
+    date_from: str = None,
+    date_to: str = None,
+    unidentified: bool = False,
+    contains: str = None,
+    group_by: list[str] = None,
+    limit: int = 100,
+) -> str:
+    """Query the rows of all the ingested reports."""
+    if limit <= 0:
+        raise ValueError("Invalid limit. Please provide a positive number.")
+
+    rows = await tool_limiter("query_fleet_reports").run_sync(
+        query_reports,
+        segment=segment,
+        driver=driver,
+        date_from=date_from,
+        date_to=date_to,
+        unidentified=unidentified,
+        contains=contains,
+        group_by=group_by,
+        limit=limit,
+    )
+    return json.dumps(rows, indent=4)
+
+
+def create_http_app():
+    """Build the streamable HTTP app of the server, called by every uvicorn worker."""
+    return mcp.streamable_http_app()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the hos_report_test MCP server.")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"], default="stdio", help="stdio for a single client, streamable-http to serve many agents")
+    parser.add_argument("--host", default=mcp.settings.host, help="Host of the HTTP server")
+    parser.add_argument("--port", type=int, default=mcp.settings.port, help="Port of the HTTP server")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes of the HTTP server")
+    args = parser.parse_args()
+
+    if args.transport == "stdio":
+        mcp.run()
+    elif args.workers == 1:
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        mcp.run(transport="streamable-http")
+    else:
+        import uvicorn
+
+        # sessions live in the memory of a worker, and requests of a client may reach any worker:
+        # each request must stand on its own. Workers read this setting when they import the server.
+        os.environ["FASTMCP_STATELESS_HTTP"] = "true"
+        uvicorn.run("hos_report_test:create_http_app", factory=True, host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,46 @@
+import json
+
+from agents.fleet_store import ingest_reports, query_reports
+
+DUTY_STATUS_SEGMENT = "changes_in_drivers_duty_status"
+DUTY_STATUS_COLUMNS = ["Time", "Event", "Odometer"]
+
+
+def _ingest(tmp_path) -> str:
+    report = {
+        "2025-06-01": {
+            "header": [[["Date of RODS", "Driver ID"], ["2025-06-01", "D1234"]]],
+            # the second page repeats the column header row, the third one continues without it
+            DUTY_STATUS_SEGMENT: [
+                [DUTY_STATUS_COLUMNS, ["08:00", "Driving", "1000"]],
+                [DUTY_STATUS_COLUMNS, ["09:00", "On-duty", "1050"]],
+                [["10:00", "Driving", "1060"]],
+            ],
+        },
+        "unidentified_driver": {
+            DUTY_STATUS_SEGMENT: [
+                [["Date/Time", "Event", "Odometer"], ["2025-06-01 06:00", "Driving", "990"], ["2025-06-03 07:00", "Driving", "1200"]],
+            ],
+        },
+    }
+    report_path = tmp_path / "report_tables.json"
+    report_path.write_text(json.dumps(report))
+    db_path = str(tmp_path / "fleet.db")
+    ingest_reports([str(report_path)], db_path=db_path)
+    return db_path
+
+
+def test_column_header_rows_are_not_ingested(tmp_path):
+    db_path = _ingest(tmp_path)
+
+    rows = query_reports(db_path=db_path, date_from="2025-06-01", date_to="2025-06-01", segment=DUTY_STATUS_SEGMENT)
+    assert sorted(row["row"][0] for row in rows if row["date"] != "unidentified_driver") == ["08:00", "09:00", "10:00"]
+    assert [row["row"] for row in query_reports(db_path=db_path, segment="header")] == [["2025-06-01", "D1234"]]
+    assert query_reports(db_path=db_path, contains="odometer") == []
+
+
+def test_unidentified_rows_are_dated_by_their_own_cells(tmp_path):
+    db_path = _ingest(tmp_path)
+
+    rows = query_reports(db_path=db_path, unidentified=True, date_from="2025-06-02", date_to="2025-06-07")
+    assert [row["row"] for row in rows] == [["2025-06-03 07:00", "Driving", "1200"]]
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+
+from agents.report_analysis import DUTY_STATUS_SEGMENT, analyze_report, check_login_pairing, check_monotonic, load_report_columns
+
+
+def _two_page_duty_status_report() -> dict:
+    """
+    A duty status segment split over two pages: the second table is a continuation without
+    column header row, starting with an event whose description names a known column.
+    """
+    first_page = [
+        ["Time", "Event", "Location", "Odometer", "Engine Hours"],
+        ["08:00", "Change in driver's duty status - Driving", "Calgary, AB", "1000", "200"],
+        ["09:00", "Change in driver's duty status - Off duty", "Calgary, AB", "1050", "201"],
+    ]
+    continuation = [
+        ["10:00", "Change in driver's duty status - On duty", "Red Deer, AB", "1100", "202"],
+        ["11:00", "Change in driver's duty status - Driving", "Red Deer, AB", "1090", "203"],
+    ]
+    return {"2025-06-01": {DUTY_STATUS_SEGMENT: [first_page, continuation]}}
+
+
+def test_continuation_table_keeps_its_rows_and_columns():
+    columns = load_report_columns(_two_page_duty_status_report())[DUTY_STATUS_SEGMENT]
+
+    assert len(columns["order"]) == 4
+    np.testing.assert_array_equal(columns["minutes"], [480, 540, 600, 660])
+    np.testing.assert_array_equal(columns["odometer"], [1000, 1050, 1100, 1090])
+    np.testing.assert_array_equal(columns["engine_hours"], [200, 201, 202, 203])
+
+
+def test_monotonic_check_spans_continuation_tables():
+    columns = load_report_columns(_two_page_duty_status_report())
+
+    findings = check_monotonic(columns, "odometer")
+
+    assert len(findings) == 1
+    assert "from 1100.0" in findings[0]["message"] and "to 1090.0" in findings[0]["message"]
+    assert check_monotonic(columns, "engine_hours") == []
+
+
+def test_report_without_login_segment(tmp_path):
+    report = {
+        "2025-06-01": {
+            "header": [[["Date of RODS", "Driver ID"], ["2025-06-01", "D1234"]]],
+            "comments_remarks_and_annotations": [[["Time", "Author", "Comment"], ["05:00", "John Smith", "Pre-trip inspection"]]],
+        }
+    }
+    data_file_path = tmp_path / "report_tables.json"
+    data_file_path.write_text(json.dumps(report))
+
+    columns = load_report_columns(report)
+    assert check_login_pairing(columns) == []
+    analysis = analyze_report(str(data_file_path))
+    assert analysis["summary"] == {"certification_coverage": 1}
@@ -0,0 +1,31 @@
+import json
+
+from agents.report_diff import revalidate_report
+
+REPORT = {
+    "2025-06-01": {
+        "header": [[["Date of RODS", "Driver ID"], ["2025-06-01", "D1234"]]],
+        "unknown_segment": [[["Time", "Note"], ["05:00", "Pre-trip"]]],
+    }
+}
+
+
+def test_results_made_without_knowledge_are_not_reused(tmp_path):
+    old_path = tmp_path / "old_tables.json"
+    new_path = tmp_path / "new_tables.json"
+    old_path.write_text(json.dumps(REPORT))
+    new_path.write_text(json.dumps(REPORT))
+    calls = []
+
+    def validate_segment(logs_date, segment_id, tables):
+        calls.append(segment_id)
+        # only the header has regulation knowledge
+        return f"{segment_id} checked", segment_id == "header"
+
+    first = revalidate_report(str(old_path), str(new_path), validate_segment)
+    second = revalidate_report(str(old_path), str(new_path), validate_segment)
+
+    assert first["results"]["2025-06-01"] == {"header": "header checked", "unknown_segment": "unknown_segment checked"}
+    assert second["results"] == first["results"]
+    assert second["reused"] == [("2025-06-01", "header")]
+    assert calls == ["header", "unknown_segment", "unknown_segment"]
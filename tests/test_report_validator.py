@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+from agents import report_validator
+
+INVALID_ANSWER = [
+    "{'valid': f", "alse}\n",
+    "Missing driver_id\n",
+    "Odometer is not a number\n",
+    "\n",
+    "{\n  'valid': false,\n  'data': {\n",
+    "    'segment_id': 'header'\n",
+]
+
+
+class FakeStream:
+    """
+    Chat completion stream yielding one delta per piece of text.
+    """
+    def __init__(self, pieces: list[str]):
+        self.pieces = pieces
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed or self.sent == len(self.pieces):
+            raise StopAsyncIteration
+        self.sent += 1
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.pieces[self.sent - 1]))])
+
+    async def close(self):
+        self.closed = True
+
+
+def _stream_validation(monkeypatch, pieces: list[str], stop_on_invalid: bool=True) -> tuple[str, list[str], FakeStream]:
+    stream = FakeStream(pieces)
+
+    async def fake_stream_chat_completion(messages, **kwargs):
+        return stream
+
+    monkeypatch.setattr(report_validator, "stream_chat_completion", fake_stream_chat_completion)
+    findings = []
+
+    async def on_finding(line, tokens):
+        findings.append(line)
+
+    result = asyncio.run(report_validator.stream_ccmta_segment("chunk", "eld", "hos", on_finding=on_finding, stop_on_invalid=stop_on_invalid))
+    return result, findings, stream
+
+
+def test_stream_stops_after_the_findings_of_an_invalid_verdict(monkeypatch):
+    result, findings, stream = _stream_validation(monkeypatch, INVALID_ANSWER)
+
+    assert findings == ["{'valid': false}", "Missing driver_id", "Odometer is not a number"]
+    assert result == "{'valid': false}\nMissing driver_id\nOdometer is not a number\n\n"
+    assert stream.closed and stream.sent < len(INVALID_ANSWER)
+
+
+def test_stream_runs_to_the_end_without_stop_on_invalid(monkeypatch):
+    result, findings, stream = _stream_validation(monkeypatch, INVALID_ANSWER, stop_on_invalid=False)
+
+    assert result == "".join(INVALID_ANSWER)
+    assert findings[-1] == "    'segment_id': 'header'"
+    assert not stream.closed
@@ -0,0 +1,88 @@
+import contextlib
+import io
+
+import pytest
+
+from agents.pdf_data_handler_v2 import iter_tables_from_pdf
+
+LONG_COMMENT = "Long comment that wraps over several lines of the cell because it is long enough to exceed the width"
+
+
+def _write_report(pdf_path: str, valign: str, padding: int | None, footer: bool=False) -> None:
+    """
+    Write a one page report with a header and a comments table whose comments wrap over several
+    lines, aligned with valign in their cells (padding None keeps the default cell padding).
+    With footer, a "Printed by" line is written below the table, in line with its first column.
+    """
+    pytest.importorskip("reportlab")
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    body = getSampleStyleSheet()["BodyText"]
+
+    def grid(rows, span_title=True):
+        style = [("GRID", (0, 0), (-1, -1), 0.5, colors.black), ("FONTSIZE", (0, 0), (-1, -1), 8), ("VALIGN", (0, 0), (-1, -1), valign)]
+        if padding is not None:
+            style += [("TOPPADDING", (0, 0), (-1, -1), padding), ("BOTTOMPADDING", (0, 0), (-1, -1), padding)]
+        if span_title:
+            style.append(("SPAN", (0, 0), (-1, 0)))
+        table = Table(rows, hAlign="LEFT")
+        table.setStyle(TableStyle(style))
+        return table
+
+    comments = [
+        ["Comments, Remarks and Annotations", "", ""],
+        ["Time", "Author", "Comment"],
+        ["05:00", "John Smith", Paragraph(LONG_COMMENT, body)],
+        ["06:00", "John Smith", "Stopped at the weigh station"],
+        ["07:00", "Dispatcher", Paragraph(LONG_COMMENT, body)],
+        ["08:00", "Dispatcher", "Load delivered"],
+    ]
+    header = [["Date of RODS", "Driver Name", "Driver ID"], ["2025-06-01", "John Smith", "D1234"]]
+    document = SimpleDocTemplate(pdf_path, pagesize=letter)
+
+    def draw_footer(canvas, document):
+        if footer:
+            canvas.setFont("Helvetica", 8)
+            canvas.drawString(document.leftMargin + 6, document.bottomMargin + 200, "Printed by ExampleELD")
+
+    document.build([grid(header, span_title=False), Spacer(1, 8), grid(comments)], onFirstPage=draw_footer)
+
+
+def _extract(pdf_path: str, fast_text: bool) -> tuple[list, dict]:
+    stats = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        tables = list(iter_tables_from_pdf(pdf_path, stats=stats, fast_text=fast_text))
+    return tables, stats
+
+
+@pytest.mark.parametrize("valign", ["TOP", "MIDDLE", "BOTTOM"])
+def test_text_fast_path_matches_table_detection(tmp_path, valign):
+    pdf_path = str(tmp_path / "report.pdf")
+    _write_report(pdf_path, valign, padding=None)
+
+    fast, stats = _extract(pdf_path, fast_text=True)
+    detected, _ = _extract(pdf_path, fast_text=False)
+
+    assert stats["text_segment"]["pages"] == 1 and "segment" not in stats
+    assert fast == detected
+    comments = dict((segment_id, rows) for _, segment_id, rows in detected)["comments_remarks_and_annotations"]
+    assert [row[0] for row in comments] == ["Time", "05:00", "06:00", "07:00", "08:00"]
+
+
+@pytest.mark.parametrize("padding, footer", [(0, False), (None, True)])
+@pytest.mark.parametrize("valign", ["TOP", "MIDDLE", "BOTTOM"])
+def test_text_fast_path_falls_back_to_table_detection(tmp_path, valign, padding, footer):
+    # wrapped rows without blank lines between them, or a footer line, cannot be parsed from the layout text
+    pdf_path = str(tmp_path / "report.pdf")
+    _write_report(pdf_path, valign, padding=padding, footer=footer)
+
+    fast, stats = _extract(pdf_path, fast_text=True)
+    detected, _ = _extract(pdf_path, fast_text=False)
+
+    assert stats["segment"]["pages"] == 1 and "text_segment" not in stats
+    assert fast == detected
+    comments = dict((segment_id, rows) for _, segment_id, rows in detected)["comments_remarks_and_annotations"]
+    assert comments[-1][0] == "08:00"